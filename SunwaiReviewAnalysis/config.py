@@ -1,3 +1,139 @@
 INPUT_CSV = "BankAppDataCollection/sunwai_sample.csv"
 OUTPUT_CSV = "result/all_predictions_detailed.csv"
-MODEL_NAME = "multilingual"
\ No newline at end of file
+MODEL_NAME = "multilingual"
+
+# Batched ABSA inference
+BATCH_SIZE = 16
+BUCKET_WINDOW = 1024
+
+# Process-pool extraction (WORKERS = 1 keeps everything in-process)
+WORKERS = 1
+SHARD_SIZE = 256
+THREADS_PER_WORKER = 1
+
+# On-disk prediction cache (keyed by normalized review text + model)
+MODEL_VERSION = "1"
+CACHE_PATH = "result/prediction_cache.sqlite"
+CACHE_MAX_ENTRIES = 200_000
+
+# Supabase bulk uploads
+UPLOAD_CHUNK_SIZE = 500
+UPLOAD_CONCURRENCY = 4
+UPLOAD_MAX_RETRIES = 4
+UPLOAD_BACKOFF_SECONDS = 0.5
+DEAD_LETTER_PATH = "result/failed_uploads.jsonl"
+
+# Local index of hashed (content, app) keys already stored in Supabase
+KEY_INDEX_PATH = "result/review_keys.sqlite"
+KEY_SYNC_PAGE_SIZE = 1000
+
+# Play Store apps to fetch, and the display names their reviews are stored under
+APP_PACKAGES = [
+    "app.com.brd",
+    "com.ofss.digx.mobile.obdx.bahl",
+    "com.ofss.tx.meezan",
+    "com.sbp.sbp_complaints_management",
+    "com.hbl.android.hblmobilebanking",
+]
+APP_NAMES = {
+    "com.ofss.digx.mobile.obdx.bahl": "Al Habib",
+    "com.ofss.tx.meezan": "Meezan Bank",
+    "app.com.brd": "UBL Digital",
+    "com.sbp.sbp_complaints_management": "Sunwai",
+    "com.hbl.android.hblmobilebanking": "HBL",
+}
+
+# Play Store fetching (rates are requests per second)
+FETCH_CONCURRENCY = 5
+FETCH_HOST_RATE = 2.0
+FETCH_HOST_BURST = 4
+FETCH_APP_RATE = 0.5
+
+# Per-stage checkpoints for resumable runs
+CHECKPOINT_DIR = "result/checkpoints"
+CHECKPOINT_EVERY = 500
+
+# Streaming mode
+STREAM_CHUNK_SIZE = 1000
+
+# Summarization
+SUMMARY_MODEL = "facebook/bart-large-cnn"
+SUMMARY_BATCH_SIZE = 8
+SUMMARY_CHUNK_WORDS = 600  # keeps each BART input well inside its 1024-token window
+SUMMARY_CACHE_PATH = "result/summary_cache.sqlite"
+
+# Run metrics and profiling
+METRICS_DIR = "result/metrics"
+METRICS_PROMETHEUS = False  # also write <run_id>.prom in Prometheus text format
+PROFILE_STAGES = False  # None/False, "cprofile" or "pyinstrument"
+
+# Near-duplicate filtering (SimHash over review words)
+NEAR_DUP_DETECTION = False
+NEAR_DUP_MAX_DISTANCE = 3
+
+# Prediction storage: "csv" (stringified lists) or "parquet" (native list columns)
+OUTPUT_FORMAT = "csv"
+PREDICTIONS_DIR = "result/predictions"
+
+# Local analytical store; when enabled the pipeline writes here first and
+# syncs reviews to Supabase in the background
+USE_LOCAL_STORE = False
+LOCAL_STORE_PATH = "result/local_store.sqlite"
+
+# Incremental summaries: merge each run's groups into persistent state and
+# only re-summarize groups that gained reviews
+INCREMENTAL_SUMMARIES = True
+GROUP_STATE_PATH = "result/group_state.sqlite"
+
+# Worker service: fetched reviews are queued in SQLite and drained by
+# long-running workers that keep the models loaded
+QUEUE_PATH = "result/review_queue.sqlite"
+QUEUE_BATCH_SIZE = 200
+QUEUE_MAX_PENDING = 50
+QUEUE_LEASE_SECONDS = 900
+QUEUE_MAX_ATTEMPTS = 3
+QUEUE_POLL_SECONDS = 5.0
+SERVICE_WORKERS = 1
+# Besides the groups its own job changed, a worker summarizes at most this
+# many groups left dirty by failed jobs
+SUMMARY_CLAIM_LIMIT = 20
+
+# Extractor inference backend: "torch" (fp32 eager), "int8" (dynamic
+# quantization of Linear layers) or "onnx" (ONNX Runtime, needs
+# `pip install optimum[onnxruntime]`)
+EXTRACTOR_BACKEND = "torch"
+ONNX_EXPORT_DIR = "result/onnx"
+
+# Per-review generation limits: max_length grows with the input's token
+# count, reviews over SEGMENT_MAX_TOKENS are split at sentence breaks, and a
+# review still generating after EXTRACT_TIME_BUDGET seconds is abandoned
+# (None disables the budget)
+GEN_MIN_LENGTH = 32
+GEN_LENGTH_RATIO = 2.0
+GEN_MAX_LENGTH = 512
+SEGMENT_MAX_TOKENS = 256
+EXTRACT_TIME_BUDGET = 20.0
+
+# Tiered extraction: trivial one-liners ("nice app", "not working") whose
+# lexicon polarity agrees with the star rating skip the ABSA model. A
+# sample of them is still sent to the model to measure agreement.
+TIERED_EXTRACTION = False
+FAST_PATH_MAX_WORDS = 6
+FAST_PATH_CATEGORY = "LAPTOP#GENERAL"
+# Used instead when every opinion is about speed or the app not working
+FAST_PATH_PERFORMANCE_CATEGORY = "SOFTWARE#OPERATION_PERFORMANCE"
+FAST_PATH_AUDIT_RATE = 0.05
+
+# Extractive pre-selection: large groups are reduced to their most central,
+# diverse reviews (TF-IDF + MMR) within a word budget before BART
+SUMMARY_PRESELECT = True
+SUMMARY_SELECT_WORDS = 600
+SUMMARY_MMR_LAMBDA = 0.7
+
+# Dashboard rollups: per-run deltas merged into SQLite, published as
+# gzipped JSON snapshots and upserted to Supabase. Off by default: the
+# rollup_* tables must first be created from datastore.rollups.SUPABASE_SCHEMA
+ROLLUPS_ENABLED = False
+ROLLUP_PATH = "result/rollups.sqlite"
+ROLLUP_SNAPSHOT_DIR = "result/rollups"
+ROLLUP_TOP_N = 20
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from .. import config
+
+
+def normalize_review(text):
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def extraction_settings():
+    """The extractor settings that change its quads, for the prediction cache key."""
+    return (f"{config.EXTRACTOR_BACKEND}:gen={config.GEN_MIN_LENGTH},{config.GEN_LENGTH_RATIO},{config.GEN_MAX_LENGTH}"
+            f":segment={config.SEGMENT_MAX_TOKENS}:budget={config.EXTRACT_TIME_BUDGET}")
+
+
+class PredictionCache:
+    """
+    SQLite-backed cache of extracted quadruples, keyed by a hash of the
+    normalized review text plus model name/version and any `settings` that
+    change the output (see extraction_settings). Least recently used
+    entries are evicted once the cache grows past `max_entries`.
+    """
+
+    def __init__(self, path=config.CACHE_PATH, model_name=config.MODEL_NAME,
+                 model_version=config.MODEL_VERSION, max_entries=config.CACHE_MAX_ENTRIES,
+                 label="Prediction cache", settings=None):
+        self.path = path
+        self.label = label
+        self.model_tag = f"{model_name}:{model_version}" + (f":{settings}" if settings else "")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_predictions_last_used ON predictions(last_used)")
+        self.conn.commit()
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_tag}\x00{normalize_review(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        found = {}
+        unique = list(set(keys))
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT key, value FROM predictions WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            found.update((k, json.loads(v)) for k, v in rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE predictions SET last_used = ? WHERE key = ?",
+                                  [(now, k) for k in found])
+            self.conn.commit()
+
+        self.hits += sum(1 for k in keys if k in found)
+        self.misses += sum(1 for k in keys if k not in found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO predictions (key, value, last_used) VALUES (?, ?, ?)",
+            [(k, json.dumps(v), now) for k, v in items],
+        )
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self.conn.execute(
+                "DELETE FROM predictions WHERE key IN "
+                "(SELECT key FROM predictions ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+            logging.info(f"🧹 Evicted {overflow} least recently used cache entries")
+
+    def log_stats(self):
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total else 0.0
+        logging.info(f"🗃️ {self.label}: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate)")
+
+    def close(self):
+        self.conn.close()
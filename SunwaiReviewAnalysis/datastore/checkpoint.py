@@ -0,0 +1,72 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import uuid
+from datetime import datetime
+import pandas as pd
+from .. import config
+
+
+class RunCheckpoint:
+    """
+    Stores one artifact per completed pipeline stage under
+    `<root>/<run_id>/`, plus a manifest of finished stages, so a crashed
+    run can be resumed with the same run id. A run that finishes removes
+    its directory.
+    """
+
+    def __init__(self, run_id=None, root=config.CHECKPOINT_DIR):
+        # The suffix keeps runs started in the same second apart
+        self.run_id = run_id or f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.dir = os.path.join(root, self.run_id)
+        os.makedirs(self.dir, exist_ok=True)
+        self.manifest_path = os.path.join(self.dir, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"run_id": self.run_id, "completed": []}
+
+    def _path(self, name):
+        return os.path.join(self.dir, f"{name}.pkl")
+
+    def _write_manifest(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def is_done(self, stage):
+        return stage in self.manifest["completed"]
+
+    def save(self, stage, df=None):
+        """Marks a stage complete, storing its DataFrame if given."""
+        if df is not None:
+            df.to_pickle(self._path(stage))
+        if stage not in self.manifest["completed"]:
+            self.manifest["completed"].append(stage)
+        self._write_manifest()
+        logging.info(f"💾 Checkpointed stage '{stage}' for run {self.run_id}")
+
+    def load(self, stage):
+        return pd.read_pickle(self._path(stage))
+
+    def save_partial(self, name, value):
+        # Written to a temp file first so a crash mid-write keeps the old copy
+        tmp = self._path(name) + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f)
+        os.replace(tmp, self._path(name))
+
+    def remove(self):
+        """Deletes the run's checkpoints once they are no longer needed for a resume."""
+        shutil.rmtree(self.dir, ignore_errors=True)
+        logging.info(f"🧹 Removed checkpoints of finished run {self.run_id}")
+
+    def load_partial(self, name, default=None):
+        if not os.path.exists(self._path(name)):
+            return default
+        with open(self._path(name), "rb") as f:
+            return pickle.load(f)
@@ -0,0 +1,50 @@
+"""
+One-shot converter from stringified-list prediction CSVs to a Parquet
+dataset with native list columns.
+
+    python -m SunwaiReviewAnalysis.datastore.convert result/all_predictied.csv result/predictions
+"""
+import argparse
+import logging
+import os
+from datetime import datetime
+import pandas as pd
+from ..preprocess.mapping import safe_parse_list
+from .saver import LIST_COLUMNS, predictions_schema
+
+
+def convert_csv_to_parquet(csv_path, output_dir, run_date=None):
+    df = pd.read_csv(csv_path, index_col=False)
+    if df.columns[0].lower() in ["unnamed: 0", "index"]:
+        df = df.drop(df.columns[0], axis=1)
+
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].map(safe_parse_list).map(lambda items: [str(i) for i in items])
+
+    if "app" not in df.columns:
+        df["app"] = "unknown"
+    if run_date is None:
+        # Files converted after the fact keep the CSV's modification date
+        run_date = datetime.utcfromtimestamp(os.path.getmtime(csv_path)).strftime("%Y-%m-%d")
+    df["run_date"] = run_date
+
+    df.to_parquet(output_dir, partition_cols=["app", "run_date"], index=False, schema=predictions_schema(df))
+    logging.info(f"✅ Converted {len(df)} rows from {csv_path} to {output_dir}")
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert prediction CSVs to a partitioned Parquet dataset.")
+    parser.add_argument("csv_paths", nargs="+", help="CSV files to convert")
+    parser.add_argument("output_dir", help="Parquet dataset directory")
+    parser.add_argument("--run-date", help="partition date to use (default: each file's mtime)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for path in args.csv_paths:
+        convert_csv_to_parquet(path, args.output_dir, run_date=args.run_date)
+
+
+if __name__ == "__main__":
+    main()
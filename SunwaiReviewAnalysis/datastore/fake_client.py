@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeTable:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self._pending = None
+        self._filters = []
+        self._order = None
+        self._limit = None
+
+    def insert(self, records):
+        self._pending = ("insert", records if isinstance(records, list) else [records])
+        return self
+
+    def upsert(self, records, on_conflict=None):
+        self._pending = ("upsert", records if isinstance(records, list) else [records])
+        return self
+
+    def select(self, columns="*"):
+        self._pending = ("select", columns)
+        return self
+
+    def gt(self, column, value):
+        self._filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+
+    def order(self, column, desc=False):
+        self._order = (column, desc)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def execute(self):
+        op, payload = self._pending
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        if op == "select":
+            with self.client.lock:
+                rows = [r for r in self.client.tables.get(self.name, []) if all(f(r) for f in self._filters)]
+            if self._order:
+                column, desc = self._order
+                rows.sort(key=lambda r: r.get(column), reverse=desc)
+            if self._limit is not None:
+                rows = rows[:self._limit]
+            if payload != "*":
+                columns = [c.strip() for c in payload.split(",")]
+                rows = [{c: r.get(c) for c in columns} for r in rows]
+            return SimpleNamespace(data=rows)
+
+        if self.client.failure_rate and self.client.rng.random() < self.client.failure_rate:
+            raise ConnectionError(f"Simulated failure writing to '{self.name}'")
+        with self.client.lock:
+            table = self.client.tables.setdefault(self.name, [])
+            for record in payload:
+                # Mimic an identity primary key so keyset paging works
+                table.append({"id": len(table) + 1, **record})
+            self.client.requests += 1
+        return SimpleNamespace(data=payload)
+
+
+class FakeSupabaseClient:
+    """
+    In-memory stand-in for the Supabase client, for tests and benchmarks.
+    Supports `table(...).insert/upsert/select(...).execute()` with optional
+    simulated latency and random failures.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.tables = {}
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return FakeTable(self, name)
@@ -1,82 +1,140 @@
 import os
 import time
-import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from google_play_scraper import Sort, reviews
-from .saver import get_existing_reviews
+from .key_index import get_review_index
+from .. import config
+from ..preprocess.cleaning import passes_cleaning
 import logging
 
-def fetch_new_reviews(app_package_names, reviews_per_app=100, output_dir='reviews_output'):
-    os.makedirs(output_dir, exist_ok=True)
 
-    logging.info("📥 Fetching new reviews from Play Store...")
-    existing = get_existing_reviews()
-    existing_set = set(
-        (r["content"].strip().lower(), r["app"].strip().lower())
-        for r in existing if r.get("content") and r.get("app")
-    )
-
-    combined_df = pd.DataFrame()
-    grand_total_skipped = 0
-
-    for app_package in app_package_names:
-        logging.info(f"\n📱 Fetching reviews for: {app_package}")
-        unique_reviews = []
-        seen_this_batch = set()
-        next_token = None
-        skipped_this_app = 0
-
-        while len(unique_reviews) < reviews_per_app:
-            batch, next_token = reviews(
-                app_package,
-                lang='en',
-                country='us',
-                sort=Sort.NEWEST,
-                count=100,
-                continuation_token=next_token
-            )
-
-            if not batch:
-                logging.warning("⚠️ No more reviews available from Play Store.")
+class TokenBucket:
+    """Thread-safe token bucket; `acquire` blocks until a token is free."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _fetch_app(app_package, reviews_per_app, index, host_limiter, app_limiter, reviews_fn, app_names):
+    logging.info(f"\n📱 Fetching reviews for: {app_package}")
+    unique_reviews = []
+    seen_this_batch = set()
+    next_token = None
+    skipped_this_app = 0
+    app = app_package.strip().lower()
+    # The index holds reviews under the name they were stored with in Supabase
+    stored_app = app_names.get(app_package, app_package)
+
+    while len(unique_reviews) < reviews_per_app:
+        app_limiter.acquire()
+        host_limiter.acquire()
+        batch, next_token = reviews_fn(
+            app_package,
+            lang='en',
+            country='us',
+            sort=Sort.NEWEST,
+            count=100,
+            continuation_token=next_token
+        )
+
+        if not batch:
+            logging.warning(f"⚠️ No more reviews available from Play Store for {app_package}.")
+            break
+
+        known = index.contains_many(
+            [review.get("content") or "" for review in batch], [stored_app] * len(batch)
+        )
+        fresh = 0
+        for review, is_known in zip(batch, known):
+            content = (review.get("content") or "").strip().lower()
+
+            if not content:
+                continue
+
+            key = (content, app)
+            if key not in seen_this_batch and not is_known:
+                review["app"] = app_package
+                unique_reviews.append(review)
+                seen_this_batch.add(key)
+                fresh += passes_cleaning(content)
+            else:
+                skipped_this_app += 1
+
+            if len(unique_reviews) >= reviews_per_app:
                 break
 
-            for review in batch:
-                content = review.get("content", "").strip().lower()
-                app = app_package.strip().lower()
-
-                if not content:
-                    continue
-
-                key = (content, app)
-                if key not in existing_set and key not in seen_this_batch:
-                    review["app"] = app_package
-                    unique_reviews.append(review)
-                    seen_this_batch.add(key)
-                else:
-                    skipped_this_app += 1
-                    grand_total_skipped += 1
-
-                if len(unique_reviews) >= reviews_per_app:
-                    break
-
-            if not next_token:
-                logging.warning("📭 Reached end of available reviews.")
-                break
-
-            time.sleep(random.uniform(1.5, 3.0))
-
-        if not unique_reviews:
-            logging.info(f"❌ No new unique reviews found for {app_package}")
-            continue
-
-        df = pd.DataFrame(unique_reviews[:reviews_per_app])  # Truncate if more
-        df["content"] = df["content"].astype(str).str.strip()
-        df = df[["content", "score", "app"]].copy()
-
-        logging.info(f"✅ {len(df)} new reviews fetched for {app_package}")
-        logging.info(f"🗑️ {skipped_this_app} duplicates skipped for {app_package}")
+        # Reviews come newest first, so a page with nothing new to predict
+        # on means everything older has been stored too. Short reviews are
+        # dropped by cleaning and never stored, so they don't count as new.
+        if not fresh:
+            logging.info(f"⏹️ Page for {app_package} had no new reviews to process, stopping early.")
+            break
+
+        if not next_token:
+            logging.warning(f"📭 Reached end of available reviews for {app_package}.")
+            break
+
+    if not unique_reviews:
+        logging.info(f"❌ No new unique reviews found for {app_package}")
+        return pd.DataFrame(), skipped_this_app
+
+    df = pd.DataFrame(unique_reviews[:reviews_per_app])  # Truncate if more
+    df["content"] = df["content"].astype(str).str.strip()
+    df = df[["content", "score", "app"]].copy()
+
+    logging.info(f"✅ {len(df)} new reviews fetched for {app_package}")
+    logging.info(f"🗑️ {skipped_this_app} duplicates skipped for {app_package}")
+    return df, skipped_this_app
+
+
+def fetch_new_reviews(app_package_names, reviews_per_app=100, output_dir='reviews_output',
+                      max_workers=config.FETCH_CONCURRENCY, host_rate=config.FETCH_HOST_RATE,
+                      app_rate=config.FETCH_APP_RATE, reviews_fn=reviews, index=None,
+                      app_names=config.APP_NAMES):
+    """
+    Fetches new reviews for several apps in parallel.
+
+    All apps share one token bucket for the Play Store host, and each app
+    also gets its own bucket. `app_names` maps package names to the app
+    names reviews are stored under. `reviews_fn` and `index` can be swapped
+    for local stubs in tests.
+    """
+    os.makedirs(output_dir, exist_ok=True)
 
-        combined_df = pd.concat([combined_df, df], ignore_index=True)
+    logging.info("📥 Fetching new reviews from Play Store...")
+    if index is None:
+        index = get_review_index()
+
+    host_limiter = TokenBucket(host_rate, capacity=config.FETCH_HOST_BURST)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [
+            pool.submit(_fetch_app, app_package, reviews_per_app, index,
+                        host_limiter, TokenBucket(app_rate), reviews_fn, app_names)
+            for app_package in app_package_names
+        ]
+        results = [future.result() for future in futures]
+
+    frames = [df for df, _ in results if not df.empty]
+    combined_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    grand_total_skipped = sum(skipped for _, skipped in results)
 
     logging.info(f"\n🎯 Total duplicate reviews skipped across all apps: {grand_total_skipped}")
     return combined_df
@@ -0,0 +1,87 @@
+import json
+import sqlite3
+import time
+from .. import config
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Durable SQLite queue of review batches. A job is leased by one worker
+    and only removed once acknowledged; leases that expire (e.g. a worker
+    crashed mid-batch) make the job available again. Several processes can
+    share the same file.
+    """
+
+    def __init__(self, path=config.QUEUE_PATH, max_pending=config.QUEUE_MAX_PENDING,
+                 lease_seconds=config.QUEUE_LEASE_SECONDS, max_attempts=config.QUEUE_MAX_ATTEMPTS):
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            "lease_until REAL, worker TEXT, error TEXT, created_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)")
+
+    def pending(self):
+        return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'leased')").fetchone()[0]
+
+    def enqueue(self, records, block=True, timeout=None, poll=config.QUEUE_POLL_SECONDS):
+        """
+        Adds a batch of review records. When `max_pending` jobs are already
+        waiting, blocks until workers catch up (or raises QueueFull).
+        """
+        started = time.monotonic()
+        while self.max_pending and self.pending() >= self.max_pending:
+            if not block or (timeout is not None and time.monotonic() - started >= timeout):
+                raise QueueFull(f"{self.max_pending} jobs already pending")
+            time.sleep(poll)
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (payload, created_at) VALUES (?, ?)",
+            (json.dumps(records, ensure_ascii=False, default=str), time.time()),
+        )
+        return cursor.lastrowid
+
+    def lease(self, worker):
+        """Claims the oldest available job; returns (job_id, records) or None."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)
+            ).fetchone()
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_until = ?, worker = ?, attempts = attempts + 1 "
+                    "WHERE id = ?", (now + self.lease_seconds, worker, row[0])
+                )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def ack(self, job_id):
+        self.conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def nack(self, job_id, error):
+        """Returns a failed job to the queue, or parks it after `max_attempts`."""
+        self.conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_until = NULL, error = ? WHERE id = ?", (self.max_attempts, str(error), job_id)
+        )
+
+    def stats(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,134 @@
+import logging
+import sqlite3
+import numpy as np
+import pandas as pd
+from .. import config
+
+
+def hash_review_keys(contents):
+    """
+    64-bit hashes of normalized (stripped, lower-cased) review text.
+    Uses pandas' deterministic hash so values are stable across runs.
+    """
+    normalized = pd.Series(contents, dtype=object).fillna("").astype(str).str.strip().str.lower()
+    return pd.util.hash_array(normalized.to_numpy(dtype=object)).view(np.int64)
+
+
+def _normalize_app(app):
+    return str(app).strip().lower()
+
+
+class ReviewKeyIndex:
+    """
+    Persistent set of hashed review keys per app, mirroring the Supabase
+    `reviews` table. Only rows newer than the last synced id are fetched,
+    and each app's keys are held in memory as a sorted int64 array.
+    """
+
+    def __init__(self, path=config.KEY_INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS review_keys ("
+            "app TEXT NOT NULL, hash INTEGER NOT NULL, PRIMARY KEY (app, hash)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sync_state (name TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.commit()
+        self.keys = {}
+        for app, hashes in pd.read_sql_query("SELECT app, hash FROM review_keys", self.conn).groupby("app"):
+            self.keys[app] = np.sort(hashes["hash"].to_numpy(dtype=np.int64))
+
+    @property
+    def last_id(self):
+        row = self.conn.execute("SELECT value FROM sync_state WHERE name = 'last_id'").fetchone()
+        return row[0] if row else 0
+
+    def sync(self, client, table_name="reviews", page_size=config.KEY_SYNC_PAGE_SIZE):
+        """Fetches rows added since the last sync, one page at a time."""
+        last_id = self.last_id
+        synced = 0
+        while True:
+            response = (
+                client.table(table_name)
+                .select("id,content,app")
+                .gt("id", last_id)
+                .order("id")
+                .limit(page_size)
+                .execute()
+            )
+            rows = response.data or []
+            if not rows:
+                break
+
+            valid = [r for r in rows if r.get("content") and r.get("app")]
+            self.add_many([r["content"] for r in valid], [r["app"] for r in valid], commit=False)
+            last_id = max(r["id"] for r in rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (name, value) VALUES ('last_id', ?)", (last_id,)
+            )
+            self.conn.commit()
+            synced += len(rows)
+            if len(rows) < page_size:
+                break
+
+        logging.info(f"📊 Synced {synced} new review keys from Supabase (last id {last_id}).")
+        return synced
+
+    def add_many(self, contents, apps, commit=True):
+        hashes = hash_review_keys(contents)
+        app_keys = pd.Series([_normalize_app(a) for a in apps], dtype=object)
+        for app, idx in app_keys.groupby(app_keys).groups.items():
+            new = hashes[np.asarray(idx)]
+            self.keys[app] = np.union1d(self.keys.get(app, np.empty(0, dtype=np.int64)), new)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO review_keys (app, hash) VALUES (?, ?)",
+                [(app, int(h)) for h in new],
+            )
+        if commit:
+            self.conn.commit()
+
+    def contains_many(self, contents, apps):
+        """Vectorized membership test; returns a boolean array."""
+        hashes = hash_review_keys(contents)
+        app_keys = pd.Series([_normalize_app(a) for a in apps], dtype=object)
+        found = np.zeros(len(hashes), dtype=bool)
+        for app, idx in app_keys.groupby(app_keys).groups.items():
+            known = self.keys.get(app)
+            if known is None or not len(known):
+                continue
+            idx = np.asarray(idx)
+            # `known` is kept sorted, so a binary search beats np.isin's re-sort
+            pos = np.searchsorted(known, hashes[idx]).clip(max=len(known) - 1)
+            found[idx] = known[pos] == hashes[idx]
+        return found
+
+    def contains(self, content, app):
+        return bool(self.contains_many([content], [app])[0])
+
+    def __len__(self):
+        return sum(len(v) for v in self.keys.values())
+
+    def close(self):
+        self.conn.close()
+
+
+_index = None
+
+
+def get_review_index(client=None, refresh=False):
+    """
+    Returns the process-wide index, syncing it from Supabase the first time
+    (or again when `refresh` is set) so every dedup check in a run shares it.
+    """
+    global _index
+    if _index is None:
+        _index = ReviewKeyIndex()
+        refresh = True
+    if refresh:
+        try:
+            if client is None:
+                from .saver import get_client
+                client = get_client()
+            _index.sync(client)
+        except Exception as e:
+            logging.error(f"❌ Failed to sync review keys, using local index only: {e}")
+    return _index
@@ -2,15 +2,27 @@
 import pandas as pd
 import json
 import os
+import re
 import sqlite3
 
+
+def _quote_identifier(name):
+    # Table/column names can't be bound as parameters, so only plain
+    # identifiers are accepted and they are always quoted.
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", name):
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return f'"{name}"'
+
 class DataLoader:
     @staticmethod
-    def load_data(file_path):
+    def load_data(file_path, columns=None):
         ext = os.path.splitext(file_path)[-1].lower()
 
         if ext == ".csv":
-            df = pd.read_csv(file_path, index_col=False)
+            df = pd.read_csv(file_path, index_col=False, usecols=columns)
+        elif ext == ".parquet" or os.path.isdir(file_path):
+            # A directory is read as a partitioned Parquet dataset
+            df = pd.read_parquet(file_path, columns=columns, memory_map=True)
         elif ext == ".json":
             with open(file_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
@@ -33,7 +45,7 @@ class DataLoader:
             raise FileNotFoundError(f"Database not found at {db_path}")
 
         conn = sqlite3.connect(db_path)
-        query = f"SELECT {review_column} FROM {table_name}"
+        query = f"SELECT {_quote_identifier(review_column)} FROM {_quote_identifier(table_name)}"
         df = pd.read_sql_query(query, conn)
         conn.close()
 
@@ -41,3 +53,51 @@ class DataLoader:
             raise ValueError(f"Table '{table_name}' must contain a '{review_column}' column")
 
         return df, df[review_column].astype(str).tolist()
+
+    @staticmethod
+    def iter_chunks(file_path, chunksize):
+        """Yields DataFrames of at most `chunksize` rows from a review file."""
+        ext = os.path.splitext(file_path)[-1].lower()
+
+        if ext == ".parquet" or os.path.isdir(file_path):
+            import pyarrow.dataset as ds
+            dataset = ds.dataset(file_path, format="parquet", partitioning="hive")
+            for batch in dataset.to_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+            return
+
+        if ext != ".csv":
+            # JSON and text inputs can't be read incrementally; slice them instead
+            df, _ = DataLoader.load_data(file_path)
+            for start in range(0, len(df), chunksize):
+                yield df.iloc[start:start + chunksize].reset_index(drop=True)
+            return
+
+        for chunk in pd.read_csv(file_path, index_col=False, chunksize=chunksize):
+            if "content" not in chunk.columns:
+                raise ValueError("Input file must contain a 'content' column")
+            yield chunk.reset_index(drop=True)
+
+    @staticmethod
+    def iter_chunks_from_db(db_path, table_name, review_column="content", chunksize=1000):
+        """
+        Pages through a SQLite table with a cursor, one chunk at a time.
+        Every column is kept (the pipeline needs `app`, and `score` for the
+        fast path); the review column is returned as `content`.
+        """
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"Database not found at {db_path}")
+
+        conn = sqlite3.connect(db_path)
+        try:
+            cursor = conn.execute(f"SELECT * FROM {_quote_identifier(table_name)}")
+            columns = [d[0] for d in cursor.description]
+            if review_column not in columns:
+                raise ValueError(f"Table '{table_name}' must contain a '{review_column}' column")
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=columns).rename(columns={review_column: "content"})
+        finally:
+            conn.close()
@@ -0,0 +1,281 @@
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from .. import config
+from ..preprocess.mapping import safe_parse_list
+from .key_index import hash_review_keys
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT,
+    app TEXT NOT NULL,
+    content TEXT NOT NULL,
+    score INTEGER,
+    date TEXT NOT NULL,
+    content_hash INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS quads (
+    review_id INTEGER NOT NULL REFERENCES reviews(id),
+    position INTEGER NOT NULL,
+    app TEXT NOT NULL,
+    date TEXT NOT NULL,
+    aspect TEXT,
+    opinion TEXT,
+    sentiment TEXT,
+    category TEXT,
+    mapped_category TEXT,
+    PRIMARY KEY (review_id, position)
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    summary TEXT,
+    aspects TEXT,
+    opinions TEXT,
+    updated_at TEXT,
+    synced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (app, category, sentiment)
+);
+CREATE INDEX IF NOT EXISTS idx_quads_app_cat_sent_date ON quads(app, mapped_category, sentiment, date);
+CREATE INDEX IF NOT EXISTS idx_reviews_app_date ON reviews(app, date);
+CREATE INDEX IF NOT EXISTS idx_reviews_run ON reviews(run_id);
+CREATE INDEX IF NOT EXISTS idx_reviews_unsynced ON reviews(synced) WHERE synced = 0;
+"""
+
+# Created separately, once any duplicates written before it existed are removed
+UNIQUE_REVIEWS = "CREATE UNIQUE INDEX idx_reviews_app_hash ON reviews(app, content_hash)"
+
+QUAD_COLUMNS = ["aspects", "opinions", "sentiments", "categories", "mapped_categories"]
+
+
+class LocalStore:
+    """
+    SQLite store for reviews, one-row-per-quad predictions and summaries.
+    Writes are batched into single transactions, all queries are
+    parameterized, and unsynced rows can be pushed to Supabase later. A
+    review is stored once per (app, content hash).
+    """
+
+    def __init__(self, path=config.LOCAL_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self._ensure_unique_reviews()
+
+    def _ensure_unique_reviews(self):
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_reviews_app_hash'"
+        ).fetchone()
+        if exists:
+            return
+        with self.conn:
+            removed = self.conn.execute(
+                "DELETE FROM reviews WHERE id NOT IN (SELECT MIN(id) FROM reviews GROUP BY app, content_hash)"
+            ).rowcount
+            self.conn.execute("DELETE FROM quads WHERE review_id NOT IN (SELECT id FROM reviews)")
+            self.conn.execute(UNIQUE_REVIEWS)
+        if removed:
+            logging.warning(f"🧹 Removed {removed} duplicate local reviews")
+
+    def close(self):
+        self.conn.close()
+
+    def write_predictions(self, df, run_id=None, date=None):
+        """
+        Inserts a predictions frame; returns the number of reviews written.
+        Reviews already in the store are skipped along with their quads.
+        """
+        date = date or datetime.utcnow().strftime("%Y-%m-%d")
+        (next_id,) = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM reviews").fetchone()
+        hashes = hash_review_keys(df["content"])
+
+        review_rows, quad_rows = [], []
+        records = df.to_dict(orient="records")
+        for offset, (record, content_hash) in enumerate(zip(records, hashes)):
+            review_id = next_id + offset
+            lists = {col: safe_parse_list(record.get(col)) for col in QUAD_COLUMNS}
+            record.update({col: list(values) for col, values in lists.items() if col in record})
+            score = record.get("score")
+            review_rows.append((
+                review_id, run_id, str(record.get("app", "")), str(record.get("content", "")),
+                None if pd.isna(score) else int(score), date, int(content_hash),
+                json.dumps(record, default=str),
+            ))
+
+            n = min(len(lists["mapped_categories"]), len(lists["sentiments"]))
+            for i in range(n):
+                quad_rows.append((
+                    review_id, i, str(record.get("app", "")), date,
+                    *(str(lists[col][i]) if i < len(lists[col]) else "NULL" for col in QUAD_COLUMNS[:-1]),
+                    str(lists["mapped_categories"][i]),
+                ))
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO reviews (id, run_id, app, content, score, date, content_hash, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", review_rows)
+            written = {rid for (rid,) in self.conn.execute("SELECT id FROM reviews WHERE id >= ?", (next_id,))}
+            quad_rows = [row for row in quad_rows if row[0] in written]
+            self.conn.executemany(
+                "INSERT INTO quads (review_id, position, app, date, aspect, opinion, sentiment, category, "
+                "mapped_category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", quad_rows)
+        if len(written) < len(review_rows):
+            logging.info(f"⏭️ Skipped {len(review_rows) - len(written)} reviews already stored locally")
+        logging.info(f"💽 Stored {len(written)} reviews / {len(quad_rows)} quads locally")
+        return len(written)
+
+    def contains_many(self, contents, apps):
+        """
+        Like ReviewKeyIndex.contains_many, for reviews in this store; unlike
+        the index it also sees rows that haven't been synced to Supabase.
+        """
+        hashes = hash_review_keys(contents)
+        app_keys = pd.Series([str(a) for a in apps], dtype=object)
+        found = np.zeros(len(hashes), dtype=bool)
+        for app, idx in app_keys.groupby(app_keys).groups.items():
+            idx = np.asarray(idx)
+            unique = np.unique(hashes[idx]).tolist()
+            known = set()
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                known.update(h for (h,) in self.conn.execute(
+                    f"SELECT content_hash FROM reviews WHERE app = ? AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [app, *chunk],
+                ))
+            found[idx] = np.isin(hashes[idx], np.fromiter(known, dtype=np.int64, count=len(known)))
+        return found
+
+    def write_summaries(self, summary_df):
+        rows = summary_df[["app", "category", "sentiment", "summary", "aspects", "opinions"]]
+        updated_at = datetime.utcnow().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO summaries (app, category, sentiment, summary, aspects, opinions, updated_at, synced) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0) "
+                "ON CONFLICT (app, category, sentiment) DO UPDATE SET summary = excluded.summary, "
+                "aspects = excluded.aspects, opinions = excluded.opinions, "
+                "updated_at = excluded.updated_at, synced = 0",
+                [(*row, updated_at) for row in rows.itertuples(index=False, name=None)],
+            )
+
+    def _where(self, run_id=None, app=None, since=None, prefix=""):
+        clauses, params = [], []
+        if run_id is not None:
+            clauses.append("r.run_id = ?")
+            params.append(run_id)
+        if app is not None:
+            clauses.append(f"{prefix}app = ?")
+            params.append(app)
+        if since is not None:
+            clauses.append(f"{prefix}date >= ?")
+            params.append(since)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def grouped_reviews(self, run_id=None, app=None, since=None):
+        """
+        The same frame group_reviews_by_app_category_sentiment produces, built
+        with SQL over the quads table.
+        """
+        where, params = self._where(run_id, app, since, prefix="q.")
+        word_filter = "instr(trim(r.content), ' ') > 0"
+        where = f"{where} AND {word_filter}" if where else f" WHERE {word_filter}"
+        # One row per quad in review order; grouping happens in pandas because
+        # SQLite doesn't guarantee a subquery's ORDER BY survives a GROUP BY
+        query = (
+            "SELECT q.app, q.mapped_category AS category, q.sentiment, "
+            "r.content AS reviews, q.aspect AS aspects, q.opinion AS opinions "
+            f"FROM quads q JOIN reviews r ON r.id = q.review_id{where} "
+            "ORDER BY q.review_id, q.position"
+        )
+        quads = pd.read_sql_query(query, self.conn, params=params)
+        return (
+            quads.groupby(["app", "category", "sentiment"], sort=False, dropna=False)
+            .agg(list)
+            .reset_index()
+        )
+
+    def category_counts(self, app=None, since=None):
+        """Quad counts per (app, mapped category, sentiment) for dashboards."""
+        where, params = self._where(app=app, since=since, prefix="")
+        return pd.read_sql_query(
+            "SELECT app, mapped_category, sentiment, COUNT(*) AS quads, COUNT(DISTINCT review_id) AS reviews "
+            f"FROM quads{where} GROUP BY app, mapped_category, sentiment ORDER BY app, quads DESC",
+            self.conn, params=params,
+        )
+
+    def sync_reviews(self, client=None, batch_size=config.UPLOAD_CHUNK_SIZE * config.UPLOAD_CONCURRENCY):
+        """
+        Uploads unsynced reviews to Supabase in id order. Only rows from
+        chunks that were uploaded are marked synced; rows from failed chunks
+        go to upload_to_supabase's dead-letter file and stay unsynced, so the
+        next sync retries them.
+        """
+        from .saver import upload_to_supabase
+
+        total, last_id = 0, 0
+        chunk_size = config.UPLOAD_CHUNK_SIZE
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, record FROM reviews WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            batch = pd.DataFrame([json.loads(record) for _, record in rows])
+            uploaded_chunks = []
+            total += upload_to_supabase(batch, "reviews", client=client, chunk_size=chunk_size,
+                                        on_chunk=uploaded_chunks.append)
+            ids = [(rid,) for n in uploaded_chunks for rid, _ in rows[n * chunk_size:(n + 1) * chunk_size]]
+            with self.conn:
+                self.conn.executemany("UPDATE reviews SET synced = 1 WHERE id = ?", ids)
+        logging.info(f"🔄 Synced {total} local reviews to Supabase")
+        return total
+
+    def sync_summaries(self):
+        """
+        Upserts unsynced summaries to Supabase. Returns False if the upsert
+        failed, in which case they stay unsynced.
+        """
+        from .saver import save_summary_to_supabase
+
+        df = pd.read_sql_query(
+            "SELECT app, category, sentiment, summary, aspects, opinions, updated_at FROM summaries WHERE synced = 0",
+            self.conn,
+        )
+        if df.empty:
+            return True
+        if not save_summary_to_supabase(df.drop(columns=["updated_at"])):
+            return False
+        # Rows rewritten since they were read keep their newer, unsynced version
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE summaries SET synced = 1 WHERE app = ? AND category = ? AND sentiment = ? AND updated_at = ?",
+                df[["app", "category", "sentiment", "updated_at"]].itertuples(index=False, name=None),
+            )
+        logging.info(f"🔄 Synced {len(df)} local summaries to Supabase")
+        return True
+
+
+def sync_in_background(path=config.LOCAL_STORE_PATH, client=None):
+    """Starts a thread that pushes unsynced reviews; join it before exiting."""
+    def run():
+        store = LocalStore(path)
+        try:
+            store.sync_reviews(client=client)
+        except Exception as e:
+            logging.error(f"❌ Background Supabase sync failed: {e}")
+        finally:
+            store.close()
+
+    thread = threading.Thread(target=run, name="supabase-sync")
+    thread.start()
+    return thread
@@ -0,0 +1,225 @@
+import gzip
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+import pandas as pd
+from .. import config
+from ..preprocess.mapping import explode_quad_store, explode_quads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_counts (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    day TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (app, category, sentiment, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS term_counts (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (app, category, sentiment, kind, term)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS applied_batches (
+    batch_id TEXT PRIMARY KEY,
+    applied_at TEXT NOT NULL
+);
+"""
+
+# Postgres DDL for the Supabase tables `publish` upserts into; run it once
+# (e.g. in the Supabase SQL editor) before enabling ROLLUPS_ENABLED
+SUPABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_daily_counts (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    day DATE NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (app, category, sentiment, day)
+);
+CREATE TABLE IF NOT EXISTS rollup_top_terms (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    aspects JSONB NOT NULL DEFAULT '[]',
+    opinions JSONB NOT NULL DEFAULT '[]',
+    PRIMARY KEY (app, category, sentiment)
+);
+CREATE TABLE IF NOT EXISTS rollup_sentiment_ratios (
+    app TEXT NOT NULL,
+    day DATE NOT NULL,
+    positive_ratio REAL NOT NULL DEFAULT 0,
+    negative_ratio REAL NOT NULL DEFAULT 0,
+    neutral_ratio REAL NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (app, day)
+);
+"""
+
+GROUP_KEYS = ["app", "category", "sentiment"]
+SENTIMENTS = ["positive", "negative", "neutral"]
+
+
+def compute_delta(df, day=None, quads=None):
+    """
+    Aggregates one batch of predictions into count deltas: quads per
+    (app, category, sentiment, day) and aspect/opinion frequencies per group.
+    When a QuadStore for `df` is given as `quads` it is read instead of
+    the list columns.
+    """
+    day = day or datetime.utcnow().strftime("%Y-%m-%d")
+    quads = explode_quads(df) if quads is None else explode_quad_store(quads, df)
+    if quads is None:
+        return pd.DataFrame(columns=GROUP_KEYS + ["day", "count"]), pd.DataFrame(columns=GROUP_KEYS + ["kind", "term", "count"])
+
+    counts = quads.groupby(GROUP_KEYS, sort=False).size().reset_index(name="count")
+    counts["day"] = day
+
+    terms = pd.concat([
+        quads[GROUP_KEYS + [column]].rename(columns={column: "term"}).assign(kind=kind)
+        for column, kind in (("aspects", "aspect"), ("opinions", "opinion"))
+    ])
+    terms = terms[terms["term"].notna() & (terms["term"].astype(str) != "NULL")]
+    terms["term"] = terms["term"].astype(str).str.strip()
+    terms = terms.groupby(GROUP_KEYS + ["kind", "term"], sort=False).size().reset_index(name="count")
+    return counts[GROUP_KEYS + ["day", "count"]], terms
+
+
+class RollupStore:
+    """
+    Dashboard aggregates kept up to date by merging each batch's deltas,
+    so they are never recomputed from raw reviews. Every batch is applied
+    at most once, which makes resumed runs safe.
+    """
+
+    def __init__(self, path=config.ROLLUP_PATH):
+        # Worker processes share the file; wait for a writer instead of failing the job
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def merge(self, batch_id, counts, terms):
+        """Adds a batch's deltas; returns False if the batch was already applied."""
+        with self.conn:
+            applied = self.conn.execute(
+                "INSERT OR IGNORE INTO applied_batches (batch_id, applied_at) VALUES (?, ?)",
+                (batch_id, datetime.utcnow().isoformat()),
+            ).rowcount
+            if not applied:
+                logging.info(f"⏭️ Rollups already include batch {batch_id}")
+                return False
+            self.conn.executemany(
+                "INSERT INTO daily_counts (app, category, sentiment, day, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (app, category, sentiment, day) DO UPDATE SET count = count + excluded.count",
+                counts.astype({"count": int}).itertuples(index=False, name=None),
+            )
+            self.conn.executemany(
+                "INSERT INTO term_counts (app, category, sentiment, kind, term, count) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (app, category, sentiment, kind, term) DO UPDATE SET count = count + excluded.count",
+                terms.astype({"count": int}).itertuples(index=False, name=None),
+            )
+        logging.info(f"📈 Merged batch {batch_id} into rollups: {len(counts)} group-days, {len(terms)} terms")
+        return True
+
+    def daily_counts(self, keys=None):
+        df = pd.read_sql_query("SELECT app, category, sentiment, day, count FROM daily_counts", self.conn)
+        return df if keys is None else df.merge(keys, on=list(keys.columns))
+
+    def top_terms(self, top_n=config.ROLLUP_TOP_N, keys=None):
+        """Top-N aspects and opinions per group as [[term, count], ...] lists."""
+        df = pd.read_sql_query(
+            "SELECT app, category, sentiment, kind, term, count FROM ("
+            "  SELECT *, ROW_NUMBER() OVER (PARTITION BY app, category, sentiment, kind "
+            "                               ORDER BY count DESC, term) AS rank FROM term_counts"
+            ") WHERE rank <= ?", self.conn, params=(top_n,),
+        )
+        if keys is not None:
+            df = df.merge(keys, on=GROUP_KEYS)
+        records = {}
+        for row in df.itertuples(index=False):
+            record = records.setdefault((row.app, row.category, row.sentiment), {
+                "app": row.app, "category": row.category, "sentiment": row.sentiment,
+                "aspects": [], "opinions": [],
+            })
+            record[f"{row.kind}s"].append([row.term, int(row.count)])
+        return pd.DataFrame(list(records.values()), columns=GROUP_KEYS + ["aspects", "opinions"])
+
+    def sentiment_ratios(self, keys=None):
+        """Share of positive/negative/neutral quads per (app, day)."""
+        counts = self.daily_counts()
+        if keys is not None:
+            counts = counts.merge(keys, on=list(keys.columns))
+        if counts.empty:
+            return pd.DataFrame(columns=["app", "day", "total"])
+        table = (counts.assign(sentiment=counts["sentiment"].str.lower())
+                 .pivot_table(index=["app", "day"], columns="sentiment", values="count", aggfunc="sum", fill_value=0)
+                 .reindex(columns=SENTIMENTS, fill_value=0))
+        total = table.sum(axis=1)
+        ratios = table.div(total.replace(0, 1), axis=0).round(4).add_suffix("_ratio")
+        return ratios.assign(total=total).rename_axis(columns=None).reset_index()
+
+    def snapshot(self, output_dir=config.ROLLUP_SNAPSHOT_DIR, run_id=None, top_n=config.ROLLUP_TOP_N):
+        """Writes all rollups as one gzipped JSON file plus a `latest` copy; returns its path."""
+        os.makedirs(output_dir, exist_ok=True)
+        payload = {
+            "generated_at": datetime.utcnow().isoformat(),
+            "run_id": run_id,
+            "daily_counts": self.daily_counts().to_dict(orient="records"),
+            "top_terms": self.top_terms(top_n).to_dict(orient="records"),
+            "sentiment_ratios": self.sentiment_ratios().to_dict(orient="records"),
+        }
+        data = gzip.compress(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        path = os.path.join(output_dir, f"rollups-{run_id or 'latest'}.json.gz")
+        for target in {path, os.path.join(output_dir, "latest.json.gz")}:
+            tmp = target + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        logging.info(f"🗜️ Wrote rollup snapshot to {path} ({len(data) / 1024:.1f} KB)")
+        return path
+
+    def publish(self, counts, client=None, chunk_size=config.UPLOAD_CHUNK_SIZE, top_n=config.ROLLUP_TOP_N):
+        """Upserts the current totals of every row the batch touched."""
+        if counts.empty:
+            return
+        if client is None:
+            from .saver import get_client
+            client = get_client()
+        groups = counts[GROUP_KEYS].drop_duplicates()
+        tables = {
+            "rollup_daily_counts": (self.daily_counts(counts[GROUP_KEYS + ["day"]].drop_duplicates()),
+                                    "app,category,sentiment,day"),
+            "rollup_top_terms": (self.top_terms(top_n, keys=groups), "app,category,sentiment"),
+            "rollup_sentiment_ratios": (self.sentiment_ratios(counts[["app", "day"]].drop_duplicates()),
+                                        "app,day"),
+        }
+        for table_name, (df, on_conflict) in tables.items():
+            rows = json.loads(df.to_json(orient="records"))
+            try:
+                for start in range(0, len(rows), chunk_size):
+                    client.table(table_name).upsert(rows[start:start + chunk_size], on_conflict=on_conflict).execute()
+                logging.info(f"✅ Upserted {len(rows)} rows to '{table_name}'")
+            except Exception as e:
+                logging.error(f"❌ Failed to upsert rollups to '{table_name}': {e}")
+
+
+def update_rollups(df, batch_id, run_id=None, client=None, quads=None):
+    """Merges a predictions batch into the rollups, then snapshots and publishes them."""
+    counts, terms = compute_delta(df, quads=quads)
+    store = RollupStore()
+    try:
+        # Publishing is idempotent, so a batch merged before a crash is still published on retry
+        store.merge(batch_id, counts, terms)
+        store.snapshot(run_id=run_id)
+        store.publish(counts, client=client)
+    finally:
+        store.close()
+    return len(counts)
@@ -1,43 +1,133 @@
 from .. import config
-from supabase import create_client, Client
 import os
-from dotenv import load_dotenv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from datetime import datetime
 import logging 
 import numpy as np
 
-def save_to_csv(df, output_path):
-    df.to_csv(output_path, index=False)
+class UploadError(Exception):
+    """Raised when rows or summaries could not be persisted to Supabase."""
+
+
+def save_to_csv(df, output_path, append=False):
+    if append and os.path.exists(output_path):
+        df.to_csv(output_path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(output_path, index=False)
     print(f"✅ Saved with separated columns at: {output_path}")
 
-# Load environment variables
-load_dotenv()
+LIST_COLUMNS = ["aspects", "opinions", "sentiments", "categories", "mapped_categories"]
+
+
+def predictions_schema(df):
+    """
+    Arrow schema for a predictions frame with the quad columns pinned to
+    list<string>. Inferred from a partition whose lists are all empty they
+    would be list<null>, and the dataset could no longer be read back.
+    """
+    import pyarrow as pa
+
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for column in LIST_COLUMNS:
+        if column in df.columns:
+            schema = schema.set(schema.get_field_index(column), pa.field(column, pa.list_(pa.string())))
+    return schema
+
+
+def save_to_parquet(df, output_dir=config.PREDICTIONS_DIR, run_date=None):
+    """
+    Writes predictions as a Parquet dataset partitioned by app and run date.
+    List columns (aspects, opinions, ...) are stored as native list<string>.
+    """
+    df = df.copy()
+    df["run_date"] = run_date or datetime.utcnow().strftime("%Y-%m-%d")
+    df.to_parquet(output_dir, partition_cols=["app", "run_date"], index=False, schema=predictions_schema(df))
+    print(f"✅ Saved Parquet dataset at: {output_dir}")
+
+@lru_cache(maxsize=None)
+def get_client():
+    """Creates the Supabase client on first use, loading credentials from .env."""
+    from dotenv import load_dotenv
+    from supabase import create_client
+
+    load_dotenv()
+    return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+def _upload_chunk(client, table_name, chunk, max_retries, backoff):
+    for attempt in range(max_retries + 1):
+        try:
+            client.table(table_name).insert(chunk).execute()
+            return True
+        except Exception as e:
+            if attempt == max_retries:
+                logging.error(f"❌ Chunk of {len(chunk)} rows failed after {max_retries + 1} attempts: {e}")
+                return False
+            delay = backoff * (2 ** attempt)
+            logging.warning(f"⚠️ Chunk upload failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+def _write_dead_letters(records, table_name, path):
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps({"table": table_name, "record": record}, default=str) + "\n")
+    logging.error(f"🪦 Wrote {len(records)} failed rows to {path}")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def upload_to_supabase(df, table_name: str):
+def upload_to_supabase(df, table_name: str, chunk_size=config.UPLOAD_CHUNK_SIZE,
+                       concurrency=config.UPLOAD_CONCURRENCY, max_retries=config.UPLOAD_MAX_RETRIES,
+                       backoff=config.UPLOAD_BACKOFF_SECONDS, dead_letter_path=config.DEAD_LETTER_PATH,
+                       client=None, skip_chunks=(), on_chunk=None):
     """
-    Uploads the DataFrame to a Supabase table.
+    Uploads the DataFrame to a Supabase table in chunks.
+
+    Chunks are sent concurrently and retried with exponential backoff.
+    Rows from chunks that still fail are appended to a dead-letter file.
 
     Args:
         df (pd.DataFrame): DataFrame to upload
         table_name (str): Supabase table name
+        client: Supabase client to use (defaults to the module client)
+        skip_chunks: indexes of chunks already uploaded by an earlier attempt
+        on_chunk: called with each chunk's index once it has been uploaded
+
+    Returns:
+        int: number of rows uploaded
     """
+    client = client or get_client()
     records = df.to_dict(orient='records')
-    for record in records:
-        try:
-            supabase.table(table_name).insert(record).execute()
-        except Exception as e:
-            print(f"❌ Failed to insert record: {record}")
-            print(e)
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    skip_chunks = set(skip_chunks)
+    if skip_chunks:
+        logging.info(f"⏩ Skipping {len(skip_chunks)} chunks uploaded by an earlier attempt")
+    uploaded, failed = 0, []
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(_upload_chunk, client, table_name, chunk, max_retries, backoff): (n, chunk)
+            for n, chunk in enumerate(chunks) if n not in skip_chunks
+        }
+        for future in as_completed(futures):
+            n, chunk = futures[future]
+            if future.result():
+                uploaded += len(chunk)
+                if on_chunk is not None:
+                    on_chunk(n)
+            else:
+                failed.extend(chunk)
+
+    if failed:
+        _write_dead_letters(failed, table_name, dead_letter_path)
+    logging.info(f"✅ Uploaded {uploaded}/{len(records)} rows to '{table_name}' in {len(chunks)} chunks")
+    return uploaded
 
 def get_existing_reviews(table_name="reviews"):
     try:
         logging.info("📥 Fetching existing reviews from Supabase...")
-        response = supabase.table("reviews").select("content,app").execute()
+        response = get_client().table("reviews").select("content,app").execute()
         existing = response.data if response.data else []
         logging.info(f"📊 Fetched {len(existing)} existing reviews from Supabase.")
         return existing
@@ -47,16 +137,30 @@ def get_existing_reviews(table_name="reviews"):
     
 
 def save_summary_to_supabase(summary_df):
+    """
+    Upserts summaries keyed on (app, category, sentiment). Returns False if
+    the upsert failed, so callers know the groups still need writing.
+    """
     if summary_df.empty:
         print("⚠️ No summary data to save.")
-        return
+        return True
 
 
     required_fields = ["app", "category", "sentiment", "summary", "aspects", "opinions"]
     missing = [col for col in required_fields if col not in summary_df.columns]
     if missing:
         print(f"❌ Missing required columns in summary_df: {missing}")
-        return
+        return False
+
+    # Groups whose review set hasn't changed keep their stored summary
+    if "cached" in summary_df.columns:
+        unchanged = int(summary_df["cached"].sum())
+        summary_df = summary_df[~summary_df["cached"]].copy()
+        if unchanged:
+            logging.info(f"⏭️ Skipping {unchanged} unchanged summaries.")
+        if summary_df.empty:
+            print("⚠️ No changed summaries to save.")
+            return True
 
     # Add updated_at
     summary_df["updated_at"] = datetime.utcnow().isoformat()
@@ -72,12 +176,12 @@ def save_summary_to_supabase(summary_df):
     data = summary_df.to_dict(orient="records")
 
     try:
-        supabase.table("summaries").upsert(
+        get_client().table("summaries").upsert(
             data,
             on_conflict="app,category,sentiment"
         ).execute()
         print(f"✅ Upserted {len(data)} summary records to Supabase.")
+        return True
     except Exception as e:
         print(f"❌ Failed to upsert summary data:\n{e}")
-
-
+        return False
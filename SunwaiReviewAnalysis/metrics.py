@@ -0,0 +1,156 @@
+import cProfile
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+import numpy as np
+from . import config
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _current_rss_mb():
+    # Resident set size right now; only Linux exposes it without psutil
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def latency_percentiles(latencies):
+    if not latencies:
+        return {}
+    values = np.asarray(latencies) * 1000
+    return {f"latency_p{p}_ms": round(float(np.percentile(values, p)), 3) for p in (50, 90, 99)}
+
+
+class StageMetrics:
+    def __init__(self, name, unit="reviews", items_in=None):
+        self.name = name
+        self.unit = unit
+        self.items_in = items_in
+        self.items_out = None
+        self.extra = {}
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self.peak_rss_growth_mb = 0.0
+        self.rss_delta_mb = None
+
+    def to_dict(self):
+        data = {
+            "stage": self.name,
+            "wall_seconds": round(self.wall_seconds, 4),
+            "cpu_seconds": round(self.cpu_seconds, 4),
+            "peak_rss_mb": round(self.peak_rss_mb, 1),
+            "peak_rss_growth_mb": round(self.peak_rss_growth_mb, 1),
+            "rss_delta_mb": None if self.rss_delta_mb is None else round(self.rss_delta_mb, 1),
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "unit": self.unit,
+        }
+        if self.wall_seconds > 0:
+            if self.items_in is not None:
+                data["items_in_per_sec"] = round(self.items_in / self.wall_seconds, 2)
+            if self.items_out is not None:
+                data[f"{self.unit}_per_sec"] = round(self.items_out / self.wall_seconds, 2)
+        data.update(self.extra)
+        return data
+
+
+class RunMetrics:
+    """
+    Collects wall time, CPU time, peak RSS and item throughput for each
+    pipeline stage and writes them as a JSON run report (and optionally a
+    Prometheus textfile). Set PROFILE_STAGES to profile every stage.
+    """
+
+    def __init__(self, run_id, output_dir=config.METRICS_DIR, prometheus=config.METRICS_PROMETHEUS,
+                 profiler=config.PROFILE_STAGES):
+        self.run_id = run_id
+        self.output_dir = output_dir
+        self.prometheus = prometheus
+        self.profiler = profiler
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, unit="reviews", items_in=None):
+        stage = StageMetrics(name, unit=unit, items_in=items_in)
+        stop_profiler = self._start_profiler(name)
+        # The peak is a process-wide high-water mark, so each stage reports how
+        # far it pushed that mark plus its change in current RSS
+        peak_before, rss_before = _peak_rss_mb(), _current_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall_seconds = time.perf_counter() - wall
+            stage.cpu_seconds = time.process_time() - cpu
+            stage.peak_rss_mb = _peak_rss_mb()
+            stage.peak_rss_growth_mb = stage.peak_rss_mb - peak_before
+            rss_after = _current_rss_mb()
+            if rss_before is not None and rss_after is not None:
+                stage.rss_delta_mb = rss_after - rss_before
+            stop_profiler()
+            self.stages.append(stage)
+            logging.info(f"⏱️ {name}: {stage.wall_seconds:.2f}s wall, {stage.cpu_seconds:.2f}s CPU, "
+                         f"+{stage.peak_rss_growth_mb:.0f} MB peak RSS ({stage.peak_rss_mb:.0f} MB total)")
+
+    def _start_profiler(self, name):
+        if not self.profiler:
+            return lambda: None
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"{self.run_id}-{name}")
+
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+
+            def stop():
+                profiler.stop()
+                with open(base + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            return stop
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def stop():
+            profiler.disable()
+            profiler.dump_stats(base + ".prof")
+        return stop
+
+    def report(self):
+        return {"run_id": self.run_id, "stages": [s.to_dict() for s in self.stages]}
+
+    def to_prometheus(self):
+        lines = []
+        for metric, key in (("wall_seconds", "wall_seconds"), ("cpu_seconds", "cpu_seconds"),
+                            ("peak_rss_megabytes", "peak_rss_mb"), ("peak_rss_growth_megabytes", "peak_rss_growth_mb"),
+                            ("rss_delta_megabytes", "rss_delta_mb"), ("items_out", "items_out")):
+            lines.append(f"# TYPE sunwai_stage_{metric} gauge")
+            for stage in self.stages:
+                value = stage.to_dict()[key]
+                if value is not None:
+                    lines.append(f'sunwai_stage_{metric}{{run_id="{self.run_id}",stage="{stage.name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"{self.run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+        if self.prometheus:
+            with open(os.path.join(self.output_dir, f"{self.run_id}.prom"), "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+        logging.info(f"📈 Run report written to {path}")
+        return path
@@ -1,7 +1,274 @@
-from pyabsa import ABSAInstruction
+import logging
+import os
+import re
+import time
+from .. import config
+
+BACKENDS = ("torch", "int8", "onnx")
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?।۔])\s+|\n+")
+
+
+class ReviewTimeout(Exception):
+    """
+    Raised when a review overruns its EXTRACT_TIME_BUDGET. `positions` are
+    the batch rows still generating when time ran out, if known.
+    """
+
+    def __init__(self, message, positions=None):
+        super().__init__(message)
+        self.positions = positions
+
+
+def generation_budget(n_tokens):
+    """`max_length` for generating from an input of `n_tokens` tokens."""
+    return min(config.GEN_MAX_LENGTH, config.GEN_MIN_LENGTH + int(n_tokens * config.GEN_LENGTH_RATIO))
+
+
+def _merge_quads(quads):
+    # Segments of one review often repeat an aspect; keep the first of each
+    seen = {}
+    for q in quads:
+        seen.setdefault((q["aspect"].lower(), q["polarity"], q["opinion"].lower(), q["category"]), q)
+    return list(seen.values())
+
+
 class QuadrupleExtractor:
-    def __init__(self, model_name="multilingual"):
+    def __init__(self, model_name="multilingual", backend=config.EXTRACTOR_BACKEND):
+        # pyabsa pulls in torch/transformers, so it is only imported once a
+        # model is actually needed.
+        from pyabsa import ABSAInstruction
+        from pyabsa.tasks.ABSAInstruction.instruction import (
+            ATEInstruction,
+            APCInstruction,
+            OpinionInstruction,
+            CategoryInstruction,
+        )
+
         self.extractor = ABSAInstruction.ABSAGenerator(model_name)
+        self.ate_instructor = ATEInstruction()
+        self.apc_instructor = APCInstruction()
+        self.op_instructor = OpinionInstruction()
+        self.cat_instructor = CategoryInstruction()
+
+        self.time_budget = config.EXTRACT_TIME_BUDGET
+        self.segment_tokens = config.SEGMENT_MAX_TOKENS
+        self.abandoned = 0
+
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown extractor backend '{backend}', expected one of {BACKENDS}")
+        self.backend = backend
+        if backend == "int8":
+            self._quantize()
+        elif backend == "onnx":
+            self._to_onnx(model_name)
+        logging.info(f"🧠 ABSA extractor '{model_name}' running on the {backend} backend")
+
+    def _quantize(self):
+        # Dynamic int8 quantization only targets CPU kernels
+        import torch
+
+        model = self.extractor.model.to("cpu").eval()
+        self.extractor.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.extractor.device = torch.device("cpu")
+
+    def _to_onnx(self, model_name):
+        """
+        Exports the generator once to ONNX_EXPORT_DIR/<model_name> and swaps
+        in an ONNX Runtime model with the same `generate` interface.
+        """
+        import torch
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+
+        export_dir = os.path.join(config.ONNX_EXPORT_DIR, model_name)
+        if not os.path.exists(os.path.join(export_dir, "config.json")):
+            logging.info(f"📦 Exporting '{model_name}' to ONNX at {export_dir}...")
+            source_dir = os.path.join(export_dir, "source")
+            self.extractor.model.save_pretrained(source_dir)
+            self.extractor.tokenizer.save_pretrained(source_dir)
+            ORTModelForSeq2SeqLM.from_pretrained(source_dir, export=True).save_pretrained(export_dir)
+        self.extractor.model = ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+        self.extractor.device = torch.device("cpu")
+
+    def _token_counts(self, texts):
+        return [len(ids) for ids in self.extractor.tokenizer(list(texts), add_special_tokens=False)["input_ids"]]
+
+    def _segments(self, text, n_tokens):
+        """
+        Splits a review longer than `segment_tokens` into sentence windows
+        that each fit the limit. Text without sentence breaks is windowed
+        by words instead, and a piece that is still too long (an emoji
+        flood, "!!!!...") by tokens.
+        """
+        if not self.segment_tokens or n_tokens <= self.segment_tokens:
+            return [(text, n_tokens)]
+        pieces = [p for p in _SENTENCE_BREAK.split(text) if p.strip()]
+        if len(pieces) == 1:
+            pieces = text.split()
+
+        windows = []
+        for piece, count in zip(pieces, self._token_counts(pieces)):
+            windows.extend(self._token_windows(piece) if count > self.segment_tokens else [(piece, count)])
+
+        segments, current, size = [], [], 0
+        for piece, count in windows:
+            if current and size + count > self.segment_tokens:
+                segments.append((" ".join(current), size))
+                current, size = [], 0
+            current.append(piece)
+            size += count
+        segments.append((" ".join(current), size))
+        return segments
+
+    def _token_windows(self, piece):
+        # Offsets slice the original text, so no token is decoded back
+        spans = self.extractor.tokenizer(piece, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        return [
+            (piece[spans[i][0]:spans[min(i + self.segment_tokens, len(spans)) - 1][1]], len(spans[i:i + self.segment_tokens]))
+            for i in range(0, len(spans), self.segment_tokens)
+        ]
+
+    def predict(self, text, max_length=None):
+        """
+        Predicts quadruples for one review. `max_length` defaults to a
+        budget derived from the review's token count; long reviews are
+        segmented and their quads merged. Raises ReviewTimeout once the
+        review has used up `time_budget` seconds.
+
+        Without a time budget each segment goes through pyabsa's own
+        ABSAGenerator.predict, so `max_length=512` with segmentation off is
+        the original fixed path. With a budget, the same four instruction
+        stages run through _predict_bucket, which checks the deadline
+        between stages; bench_generation_budget reports their agreement.
+        """
+        deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        n_tokens = self._token_counts([text])[0] if self.segment_tokens or not max_length else None
+        segments = self._segments(text, n_tokens)
+        quads = []
+        for segment, segment_tokens in segments:
+            budget = max_length or generation_budget(segment_tokens)
+            if deadline is None:
+                result = self.extractor.predict(segment, max_length=budget)
+            else:
+                result = self._predict_bucket([segment], budget, deadline)[0]
+            quads.extend(result["Quadruples"])
+        return {"text": text, "Quadruples": _merge_quads(quads) if len(segments) > 1 else quads}
+
+    def predict_batch(self, texts, batch_size=16, max_length=None, latencies=None):
+        """
+        Predicts quadruples for a list of reviews.
+
+        Reviews are sorted by length so each batch pads to a similar size,
+        then results are returned in the original order. Each batch gets a
+        generation budget sized to its longest review and a time budget of
+        `time_budget` per review. Reviews needing segmentation go through
+        `predict`. If a batch fails its reviews are retried one at a time;
+        if it overruns, the reviews that ran out of time are abandoned
+        rather than given a fresh budget, and only the rest are retried.
+
+        If a `latencies` list is given, each review's latency is appended in
+        input order: its own time when predicted alone, otherwise its
+        batch's time shared evenly by the batch's reviews.
+        """
+        if not texts:
+            return []
+        results = [None] * len(texts)
+        timings = [0.0] * len(texts)
+        counts = self._token_counts(texts)
+        order = sorted(range(len(texts)), key=lambda i: counts[i])
+        if self.segment_tokens:
+            for i in [i for i in order if counts[i] > self.segment_tokens]:
+                started = time.perf_counter()
+                results[i] = self._predict_single(texts[i], max_length)
+                timings[i] = time.perf_counter() - started
+            order = [i for i in order if counts[i] <= self.segment_tokens]
+
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            batch = [texts[i] for i in bucket]
+            started = time.perf_counter()
+            deadline = time.perf_counter() + self.time_budget * len(batch) if self.time_budget else None
+            try:
+                outputs = self._predict_bucket(batch, max_length or generation_budget(counts[bucket[-1]]), deadline)
+            except ReviewTimeout as e:
+                # Without the unfinished rows, blame the longest review, which sets the batch's length
+                overran = set(e.positions or [len(batch) - 1])
+                logging.warning(f"⚠️ Batch of {len(batch)} overran, retrying {len(batch) - len(overran)} single reviews")
+                outputs = [self._abandon(text) if n in overran else self._predict_single(text, max_length)
+                           for n, text in enumerate(batch)]
+            except Exception as e:
+                logging.warning(f"⚠️ Batch of {len(batch)} failed ({e}), falling back to single reviews")
+                outputs = [self._predict_single(text, max_length) for text in batch]
+
+            elapsed = (time.perf_counter() - started) / len(bucket)
+            for i, output in zip(bucket, outputs):
+                results[i] = output
+                timings[i] = elapsed
+
+        if latencies is not None:
+            latencies.extend(timings)
+        return results
+
+    def _predict_single(self, text, max_length):
+        try:
+            return self.predict(text, max_length=max_length)
+        except ReviewTimeout:
+            return self._abandon(text)
+        except Exception as e:
+            logging.error(f"❌ Error: {e} for review: {text[:50]}...")
+        return {"text": text, "Quadruples": []}
+
+    def _abandon(self, text):
+        self.abandoned += 1
+        logging.warning(f"⏱️ Abandoned review after {self.time_budget}s: {text[:50]}...")
+        return {"text": text, "Quadruples": []}
+
+    def _generate(self, prompts, max_length, deadline=None):
+        kwargs = {}
+        if deadline is not None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise ReviewTimeout("time budget exceeded")
+            # `max_time` stops generation mid-sequence, so an overrun output is discarded
+            kwargs["max_time"] = remaining
+
+        tokenizer = self.extractor.tokenizer
+        inputs = tokenizer(
+            prompts, padding=True, truncation=True, return_tensors="pt"
+        ).to(self.extractor.device)
+        outputs = self.extractor.model.generate(**inputs, max_length=max_length, **kwargs)
+        if deadline is not None and time.perf_counter() >= deadline:
+            # Rows that finished in time end with an EOS token
+            finished = (outputs == tokenizer.eos_token_id).any(dim=1).tolist()
+            raise ReviewTimeout("time budget exceeded", [n for n, done in enumerate(finished) if not done] or None)
+        return tokenizer.batch_decode(outputs, skip_special_tokens=True)
+
+    def _predict_bucket(self, texts, max_length, deadline=None):
+        # Mirrors ABSAGenerator.predict, but runs each of the four
+        # instruction stages over the whole batch at once.
+        ate_outputs = self._generate(
+            [self.ate_instructor.prepare_input(t) for t in texts], max_length, deadline
+        )
+        apc_outputs = self._generate(
+            [self.apc_instructor.prepare_input(t, a) for t, a in zip(texts, ate_outputs)], max_length, deadline
+        )
+        op_outputs = self._generate(
+            [self.op_instructor.prepare_input(t, a) for t, a in zip(texts, ate_outputs)], max_length, deadline
+        )
+        cat_outputs = self._generate(
+            [self.cat_instructor.prepare_input(t, a) for t, a in zip(texts, ate_outputs)], max_length, deadline
+        )
 
-    def predict(self, text, max_length=512):
-        return self.extractor.predict(text, max_length=max_length)
+        results = []
+        for text, ate, apc, op, cat in zip(texts, ate_outputs, apc_outputs, op_outputs, cat_outputs):
+            quads = [
+                {
+                    "aspect": asp.strip(),
+                    "polarity": sent.strip().partition(":")[2],
+                    "opinion": opn.strip().partition(":")[2],
+                    "category": c.strip().partition(":")[2],
+                }
+                for asp, sent, opn, c in zip(ate.split("|"), apc.split("|"), op.split("|"), cat.split("|"))
+            ]
+            results.append({"text": text, "Quadruples": quads})
+        return results
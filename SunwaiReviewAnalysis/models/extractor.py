@@ -1,18 +1,116 @@
 # absa_quad_extractor/processor.py
 import logging
+import time
+from .. import config
+from . import fast_path
+from .ABSA import ReviewTimeout
+from .quad_store import QuadStore
+
+
+def _split_quads(result):
+    quads = result.get("Quadruples", [])
+    aspects = [q["aspect"] for q in quads]
+    opinions = [q["opinion"] for q in quads]
+    sentiments = [q["polarity"] for q in quads]
+    categories = [q["category"] for q in quads]
+    return aspects, opinions, sentiments, categories
+
+
+def _predict_all(reviews, extractor, batch_size, latencies):
+    if batch_size > 1 and hasattr(extractor, "predict_batch"):
+        # Length-bucketing happens inside each window, so the window is kept
+        # much larger than a batch while still giving regular progress logs.
+        total = len(reviews)
+        window = max(batch_size, config.BUCKET_WINDOW)
+        for start in range(0, total, window):
+            chunk = reviews[start:start + window]
+            # Timed per batch inside the window, so long-review batches show in the tail
+            results = extractor.predict_batch(chunk, batch_size=batch_size, latencies=latencies)
+            yield from results
+            logging.info(f"✅ Extracted {min(start + window, total)}/{total} reviews")
+        return
+
+    for review in reviews:
+        started = time.perf_counter()
+        try:
+            result = extractor.predict(review)
+        except ReviewTimeout:
+            extractor.abandoned += 1
+            logging.warning(f"⏱️ Abandoned review after {extractor.time_budget}s: {review[:50]}...")
+            result = {}
+        except Exception as e:
+            logging.error(f"❌ Error: {e} for review: {review[:50]}...")
+            result = {}
+        latencies.append(time.perf_counter() - started)
+        yield result
+
+
+_FIELDS = ("aspects", "opinions", "sentiments", "categories")
+
+
+def _extract_with_cache(reviews, extractor, cache, **kwargs):
+    keys = [cache.key(review) for review in reviews]
+    cached = cache.get_many(keys)
+
+    # Identical texts within this run are only sent to the model once
+    pending = {}
+    for key, review in zip(keys, reviews):
+        if key not in cached and key not in pending:
+            pending[key] = review
+    logging.info(f"🗃️ {len(pending)} unique uncached reviews sent to the model")
+
+    fresh = extract_quadruples(list(pending.values()), extractor, **kwargs)
+    for key, values in zip(pending, zip(*fresh)):
+        cached[key] = dict(zip(_FIELDS, values))
+
+    # Empty results are not cached so failed reviews are retried next run
+    cache.put_many([(key, cached[key]) for key in pending if cached[key]["aspects"]])
+    cache.log_stats()
+
+    return tuple([cached[key][field] for key in keys] for field in _FIELDS)
+
+
+def extract_quadruples(reviews, extractor, batch_size=config.BATCH_SIZE, workers=config.WORKERS,
+                       model_name=config.MODEL_NAME, cache=None, latencies=None, as_store=False, stats=None):
+    """
+    Extracts quadruples for each review and returns four aligned lists
+    (aspects, opinions, sentiments, categories), or a QuadStore when
+    `as_store` is set. If a `latencies` list is given, per-review inference
+    time in seconds is appended to it. With worker processes, reviews they
+    abandoned are counted into `stats["abandoned"]`; in-process they are
+    counted on the extractor.
+    """
+    if cache is not None or workers > 1:
+        if cache is not None:
+            lists = _extract_with_cache(reviews, extractor, cache, batch_size=batch_size, workers=workers,
+                                        model_name=model_name, latencies=latencies, stats=stats)
+        else:
+            from .parallel import ExtractorPool, extract_quadruples_parallel
+            # A runner's pool stands in for the extractor, so workers keep their loaded models
+            pool = extractor if isinstance(extractor, ExtractorPool) else None
+            lists = extract_quadruples_parallel(reviews, model_name=model_name, workers=workers, batch_size=batch_size,
+                                                latencies=latencies, stats=stats, pool=pool)
+        return QuadStore.from_lists(*lists) if as_store else lists
+
+    if as_store:
+        store = QuadStore()
+        for result in _predict_all(reviews, extractor, batch_size, [] if latencies is None else latencies):
+            try:
+                store.append(*_split_quads(result))
+            except Exception as e:
+                logging.error(f"❌ Error: {e} for review: {str(result)[:50]}...")
+                store.append([], [], [], [])
+        return store
 
-def extract_quadruples(reviews, extractor):
     all_aspects, all_opinions, all_sentiments, all_categories = [], [], [], []
+    if latencies is None:
+        latencies = []
 
     total = len(reviews)
-    for idx, review in enumerate(reviews, 1):
+    results = _predict_all(reviews, extractor, batch_size, latencies)
+    for idx, (review, result) in enumerate(zip(reviews, results), 1):
         try:
-            result = extractor.predict(review)
-            quads = result.get("Quadruples", [])
-            aspects = [q["aspect"] for q in quads]
-            opinions = [q["opinion"] for q in quads]
-            sentiments = [q["polarity"] for q in quads]
-            categories = [q["category"] for q in quads]
+            aspects, opinions, sentiments, categories = _split_quads(result)
         except Exception as e:
             logging.error(f"❌ Error: {e} for review: {review[:50]}...")
             aspects, opinions, sentiments, categories = [], [], [], []
@@ -22,7 +120,47 @@ def extract_quadruples(reviews, extractor):
         all_sentiments.append(sentiments)
         all_categories.append(categories)
 
-        logging.info(f"✅ Extracted {idx}/{total} reviews")
+        if batch_size <= 1:
+            logging.info(f"✅ Extracted {idx}/{total} reviews")
 
     return all_aspects, all_opinions, all_sentiments, all_categories
 
+
+def extract_quadruples_tiered(reviews, extractor, scores=None, stats=None, **kwargs):
+    """
+    Like extract_quadruples, but trivial reviews are answered by the
+    lexicon fast path and only the rest go to the model. A sample of the
+    fast-path reviews is also run through the model, and routing and
+    agreement counts are accumulated into `stats`.
+    """
+    from ..preprocess.mapping import map_categories
+
+    if stats is None:
+        stats = {}
+    fast, slow = fast_path.route(reviews, scores)
+    audit = fast_path.audit_sample(fast)
+    positions = slow + audit
+    model_results = dict(zip(positions, zip(*extract_quadruples([reviews[i] for i in positions], extractor,
+                                                                stats=stats, **kwargs))))
+
+    out = ([], [], [], [])
+    for i in range(len(reviews)):
+        if i in fast:
+            quad = fast[i]
+            values = ([quad["aspect"]], [quad["opinion"]], [quad["polarity"]], [quad["category"]])
+        else:
+            values = model_results[i]
+        for collected, value in zip(out, values):
+            collected.append(value)
+
+    for i in audit:
+        _, _, sentiments, categories = model_results[i]
+        stats["audit_polarity_agree"] = stats.get("audit_polarity_agree", 0) + int(
+            fast[i]["polarity"] in {str(s).strip().lower() for s in sentiments})
+        stats["audit_category_agree"] = stats.get("audit_category_agree", 0) + int(
+            map_categories([fast[i]["category"]])[0] in map_categories(categories))
+    stats["audited"] = stats.get("audited", 0) + len(audit)
+    stats["fast_path"] = stats.get("fast_path", 0) + len(fast)
+    stats["model"] = stats.get("model", 0) + len(slow)
+    fast_path.log_routing(stats)
+    return out
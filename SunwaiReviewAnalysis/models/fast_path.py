@@ -0,0 +1,128 @@
+import logging
+import re
+import numpy as np
+from .. import config
+
+POSITIVE = {
+    "good", "nice", "great", "best", "excellent", "awesome", "amazing", "superb", "perfect", "love",
+    "helpful", "useful", "easy", "fast", "smooth", "fantastic", "outstanding", "wonderful", "exilnt",
+    "excellant", "gud", "acha", "zabardast", "👍", "👍🏻", "❤️", "❤", "😍", "👌",
+}
+NEGATIVE = {
+    "bad", "worst", "poor", "useless", "pathetic", "terrible", "horrible", "rubbish", "waste", "bakwas",
+    "nonsense", "disappointing", "frustrating", "stupid", "slow", "fake", "ghatiya", "👎", "😡", "🤬",
+}
+# "not working", "not open", ... are complaints about the app as a whole
+BROKEN = {"working", "work", "works", "open", "opening", "useful"}
+# Opinions the model files as performance rather than general experience
+PERFORMANCE = {"slow", "fast", "smooth", "not working", "not work", "not works", "not open", "not opening"}
+FILLER = {
+    "app", "apps", "aap", "application", "very", "v", "so", "too", "really", "extremely", "this", "is",
+    "it", "its", "it's", "the", "a", "an", "and", "bank", "banking", "experience", "overall", "i", "ever",
+    "to", "use", "app.", "job", "one", "of", "most",
+}
+_TOKEN = re.compile(r"[\w']+|[^\w\s]", re.UNICODE)
+
+
+def _tokens(text):
+    return [t for t in _TOKEN.findall(str(text).lower()) if t not in ".,!?-…:;()"]
+
+
+def _score_polarity(score):
+    try:
+        score = int(score)
+    except (TypeError, ValueError):
+        return None
+    return "positive" if score >= 4 else "negative" if score <= 2 else "neutral"
+
+
+def classify(text, score=None, max_words=config.FAST_PATH_MAX_WORDS):
+    """
+    Returns a general-experience quadruple for trivial reviews ("nice app",
+    "worst app ever"), or a performance one ("too slow", "not working"),
+    or None when the review should go to the full model. A review is
+    trivial when every token is an opinion or filler word, the opinion
+    polarity is unambiguous, and it agrees with the Play Store star rating
+    when one is available. Reviews mixing performance and general opinions
+    go to the model.
+    """
+    tokens = _tokens(text)
+    if not tokens or len(tokens) > max_words:
+        return None
+
+    opinions, polarities = [], set()
+    negate = False
+    for token in tokens:
+        if token in ("not", "never", "no"):
+            negate = True
+            continue
+        if negate:
+            if token not in BROKEN and token not in POSITIVE:
+                # "not bad", "no otp", ... need the model
+                return None
+            opinions.append(f"not {token}")
+            polarities.add("negative")
+        elif token in POSITIVE or token in NEGATIVE:
+            polarities.add("positive" if token in POSITIVE else "negative")
+            if token[0].isalnum():
+                # Emojis set the polarity but are not reported as opinions
+                opinions.append(token)
+        elif token not in FILLER:
+            # Anything substantive ("otp", "login", ...) needs the model
+            return None
+        negate = False
+
+    if negate or len(polarities) != 1:
+        return None
+    polarity = polarities.pop()
+    rated = _score_polarity(score)
+    if rated is not None and rated != polarity:
+        return None
+
+    kinds = {opinion in PERFORMANCE for opinion in opinions}
+    if len(kinds) > 1:
+        return None
+    return {
+        "aspect": "app" if {"app", "apps", "aap", "application"} & set(tokens) else "NULL",
+        "opinion": " ".join(dict.fromkeys(opinions)),
+        "polarity": polarity,
+        # Raw categories the model uses; they map to APP#PERFORMANCE and
+        # APP#GENERAL_EXPERIENCE
+        "category": config.FAST_PATH_PERFORMANCE_CATEGORY if kinds == {True} else config.FAST_PATH_CATEGORY,
+    }
+
+
+def route(reviews, scores=None):
+    """Splits reviews into fast-path results (by position) and positions that need the model."""
+    if scores is None:
+        scores = [None] * len(reviews)
+    fast, slow = {}, []
+    for i, (review, score) in enumerate(zip(reviews, scores)):
+        quad = classify(review, score)
+        if quad is None:
+            slow.append(i)
+        else:
+            fast[i] = quad
+    return fast, slow
+
+
+def audit_sample(fast, rate=config.FAST_PATH_AUDIT_RATE, seed=0):
+    """Positions of fast-path reviews to double-check against the full model."""
+    positions = np.array(sorted(fast), dtype=np.int64)
+    if not len(positions) or rate <= 0:
+        return []
+    n = max(1, int(round(len(positions) * rate)))
+    return sorted(np.random.default_rng(seed).choice(positions, size=min(n, len(positions)), replace=False).tolist())
+
+
+def log_routing(stats):
+    total = stats.get("fast_path", 0) + stats.get("model", 0)
+    if not total:
+        return
+    message = (f"🚦 Routed {stats.get('fast_path', 0)}/{total} reviews "
+               f"({stats.get('fast_path', 0) / total:.1%}) through the fast path")
+    if stats.get("audited"):
+        message += (f"; audit vs full model: {stats['audit_polarity_agree'] / stats['audited']:.1%} polarity, "
+                    f"{stats['audit_category_agree'] / stats['audited']:.1%} category agreement "
+                    f"on {stats['audited']} reviews")
+    logging.info(message)
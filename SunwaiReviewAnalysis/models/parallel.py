@@ -0,0 +1,96 @@
+import logging
+import multiprocessing as mp
+import os
+from .. import config
+
+_worker_extractor = None
+
+
+def _init_worker(model_name, threads):
+    # Thread limits must be in place before torch is imported in the child.
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+    import torch
+    torch.set_num_threads(threads)
+
+    from .ABSA import QuadrupleExtractor
+    global _worker_extractor
+    _worker_extractor = QuadrupleExtractor(model_name=model_name)
+    logging.info(f"🧵 Worker {os.getpid()} loaded model '{model_name}' with {threads} thread(s)")
+
+
+def _extract_shard(args):
+    from .extractor import extract_quadruples
+    start, shard, batch_size = args
+    latencies = []
+    abandoned = _worker_extractor.abandoned
+    quads = extract_quadruples(shard, _worker_extractor, batch_size=batch_size, workers=1, latencies=latencies)
+    return start, quads, latencies, _worker_extractor.abandoned - abandoned
+
+
+class ExtractorPool:
+    """
+    Worker processes that each load a QuadrupleExtractor once. A pool is
+    kept for a whole run and reused by every extraction call until `close`.
+    """
+
+    def __init__(self, model_name=config.MODEL_NAME, workers=config.WORKERS,
+                 threads_per_worker=config.THREADS_PER_WORKER):
+        self.workers = workers
+        ctx = mp.get_context("spawn")
+        self.pool = ctx.Pool(workers, initializer=_init_worker, initargs=(model_name, threads_per_worker))
+
+    def imap(self, shards):
+        # imap keeps shard order while still streaming results as they finish
+        return self.pool.imap(_extract_shard, shards)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def extract_quadruples_parallel(reviews, model_name=config.MODEL_NAME, workers=config.WORKERS,
+                                shard_size=config.SHARD_SIZE, threads_per_worker=config.THREADS_PER_WORKER,
+                                batch_size=config.BATCH_SIZE, latencies=None, stats=None, pool=None):
+    """
+    Splits reviews into shards and extracts them across a pool of worker
+    processes, each holding its own QuadrupleExtractor. Results are merged
+    back in the original review order, the workers' per-review latencies
+    are appended to `latencies` and their abandoned reviews are counted
+    into `stats["abandoned"]` when those are given. An ExtractorPool passed
+    as `pool` is reused; otherwise one is started for this call.
+    """
+    all_aspects, all_opinions, all_sentiments, all_categories = [], [], [], []
+    total = len(reviews)
+    if total == 0:
+        return all_aspects, all_opinions, all_sentiments, all_categories
+
+    owned = pool is None
+    if owned:
+        pool = ExtractorPool(model_name=model_name, workers=workers, threads_per_worker=threads_per_worker)
+    shards = [(start, reviews[start:start + shard_size], batch_size) for start in range(0, total, shard_size)]
+    logging.info(f"🧵 Extracting {total} reviews in {len(shards)} shards across {pool.workers} workers")
+
+    try:
+        for start, (aspects, opinions, sentiments, categories), shard_latencies, abandoned in pool.imap(shards):
+            all_aspects.extend(aspects)
+            all_opinions.extend(opinions)
+            all_sentiments.extend(sentiments)
+            all_categories.extend(categories)
+            if latencies is not None:
+                latencies.extend(shard_latencies)
+            if stats is not None:
+                stats["abandoned"] = stats.get("abandoned", 0) + abandoned
+            logging.info(f"✅ Merged shard at {start}: {len(all_aspects)}/{total} reviews")
+    finally:
+        if owned:
+            pool.close()
+
+    return all_aspects, all_opinions, all_sentiments, all_categories
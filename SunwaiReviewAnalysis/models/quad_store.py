@@ -0,0 +1,195 @@
+from array import array
+import numpy as np
+import pandas as pd
+
+POLARITIES = ("positive", "negative", "neutral")
+
+
+class StringPool:
+    """Interns strings to dense int32 ids; each distinct value is stored once."""
+
+    def __init__(self, initial=()):
+        self.ids = {}
+        self.values = []
+        for value in initial:
+            self.intern(value)
+
+    def intern(self, value):
+        value = "NULL" if value is None else str(value)
+        id_ = self.ids.get(value)
+        if id_ is None:
+            id_ = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return id_
+
+    def __len__(self):
+        return len(self.values)
+
+
+class QuadStore:
+    """
+    Columnar store of extracted quadruples. Quads of review i occupy rows
+    offsets[i]:offsets[i + 1] of flat arrays: interned ids for aspect,
+    opinion and raw category, and a small-int polarity code. Alignment of
+    the four fields is guaranteed by construction, and column properties
+    return the stored arrays without copying.
+    """
+
+    DTYPES = {
+        "lengths": np.int32, "aspect_ids": np.int32, "opinion_ids": np.int32,
+        "category_ids": np.int32, "polarity_codes": np.int16,
+    }
+
+    def __init__(self):
+        self.aspects = StringPool()
+        self.opinions = StringPool()
+        self.categories = StringPool()
+        self.polarities = StringPool(POLARITIES)
+        # Appends go to compact array buffers that are folded into the
+        # NumPy columns on first read
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in self.DTYPES.items()}
+        self._pending = {name: array(np.dtype(dtype).char) for name, dtype in self.DTYPES.items()}
+        self._n_reviews = 0
+        self._n_quads = 0
+
+    def append(self, aspects, opinions, sentiments, categories):
+        """Adds one review's quads, given as the extractor's aligned per-field lists."""
+        n = min(len(aspects), len(opinions), len(sentiments), len(categories))
+        pending = self._pending
+        pending["aspect_ids"].extend(self.aspects.intern(a) for a in aspects[:n])
+        pending["opinion_ids"].extend(self.opinions.intern(o) for o in opinions[:n])
+        pending["polarity_codes"].extend(self.polarities.intern(s) for s in sentiments[:n])
+        pending["category_ids"].extend(self.categories.intern(c) for c in categories[:n])
+        pending["lengths"].append(n)
+        self._n_reviews += 1
+        self._n_quads += n
+
+    def append_result(self, result):
+        quads = (result or {}).get("Quadruples", [])
+        self.append([q["aspect"] for q in quads], [q["opinion"] for q in quads],
+                    [q["polarity"] for q in quads], [q["category"] for q in quads])
+
+    def extend(self, other):
+        """Appends another store's reviews, re-interning its strings into this store's pools."""
+        fields = (
+            ("aspect_ids", self.aspects, other.aspects), ("opinion_ids", self.opinions, other.opinions),
+            ("polarity_codes", self.polarities, other.polarities), ("category_ids", self.categories, other.categories),
+        )
+        for name, pool, other_pool in fields:
+            remap = np.array([pool.intern(value) for value in other_pool.values], dtype=self.DTYPES[name])
+            self._pending[name].frombytes(remap[other._column(name)].tobytes())
+        self._pending["lengths"].frombytes(other.lengths.tobytes())
+        self._n_reviews += len(other)
+        self._n_quads += other.n_quads
+
+    @classmethod
+    def from_lists(cls, aspects, opinions, sentiments, categories):
+        store = cls()
+        for values in zip(aspects, opinions, sentiments, categories):
+            store.append(*values)
+        return store
+
+    def _column(self, name):
+        pending = self._pending[name]
+        if len(pending):
+            self._columns[name] = np.concatenate(
+                [self._columns[name], np.frombuffer(pending, dtype=self.DTYPES[name])]
+            )
+            self._pending[name] = array(pending.typecode)
+        return self._columns[name]
+
+    def __len__(self):
+        return self._n_reviews
+
+    @property
+    def n_quads(self):
+        return self._n_quads
+
+    @property
+    def lengths(self):
+        return self._column("lengths")
+
+    @property
+    def offsets(self):
+        return np.concatenate([[0], np.cumsum(self.lengths, dtype=np.int64)])
+
+    @property
+    def aspect_ids(self):
+        return self._column("aspect_ids")
+
+    @property
+    def opinion_ids(self):
+        return self._column("opinion_ids")
+
+    @property
+    def category_ids(self):
+        return self._column("category_ids")
+
+    @property
+    def polarity_codes(self):
+        return self._column("polarity_codes")
+
+    def review_index(self):
+        """Review position of every quad."""
+        return np.repeat(np.arange(len(self), dtype=np.int32), self.lengths)
+
+    def nbytes(self):
+        """Size of the flat columns (the interned string pools are extra)."""
+        return sum(self._column(name).nbytes for name in self.DTYPES)
+
+    def mapped_categories(self):
+        """Mapped category of every quad; each distinct raw category is mapped once."""
+        from ..preprocess.mapping import MAPPED_CATEGORY_DTYPE, map_category_codes
+        lookup = map_category_codes(self.categories.values).codes
+        return pd.Categorical.from_codes(lookup[self.category_ids], dtype=MAPPED_CATEGORY_DTYPE)
+
+    @staticmethod
+    def _categorical(ids, pool):
+        return pd.Categorical.from_codes(ids, categories=pd.Index(pool.values, dtype=object), validate=False)
+
+    def to_frame(self, mapped=False):
+        """Exploded one-row-per-quad frame with categorical string columns."""
+        frame = pd.DataFrame({
+            "review": self.review_index(),
+            "aspect": self._categorical(self.aspect_ids, self.aspects),
+            "opinion": self._categorical(self.opinion_ids, self.opinions),
+            "sentiment": self._categorical(self.polarity_codes, self.polarities),
+            "category": self._categorical(self.category_ids, self.categories),
+        })
+        if mapped:
+            frame["mapped_category"] = self.mapped_categories()
+        return frame
+
+    def to_arrow(self):
+        """Exploded Arrow table; string columns are dictionary arrays over the interned pools."""
+        import pyarrow as pa
+
+        def column(ids, pool):
+            return pa.DictionaryArray.from_arrays(pa.array(ids), pa.array(pool.values, type=pa.string()))
+
+        return pa.table({
+            "review": pa.array(self.review_index()),
+            "aspect": column(self.aspect_ids, self.aspects),
+            "opinion": column(self.opinion_ids, self.opinions),
+            "sentiment": column(self.polarity_codes, self.polarities),
+            "category": column(self.category_ids, self.categories),
+        })
+
+    def to_lists(self, mapped=False):
+        """
+        The extractor's four per-review lists, for the list columns written
+        to outputs; with `mapped`, the mapped categories are a fifth list.
+        """
+        bounds = self.offsets.tolist()
+        fields = [
+            (self.aspect_ids, self.aspects.values), (self.opinion_ids, self.opinions.values),
+            (self.polarity_codes, self.polarities.values), (self.category_ids, self.categories.values),
+        ]
+        if mapped:
+            labels = self.mapped_categories()
+            fields.append((labels.codes, labels.categories))
+        out = []
+        for ids, pool in fields:
+            values = np.asarray(pool, dtype=object)[ids].tolist()
+            out.append([values[start:end] for start, end in zip(bounds[:-1], bounds[1:])])
+        return tuple(out)
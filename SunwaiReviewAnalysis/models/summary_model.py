@@ -1,73 +1,206 @@
-from transformers import pipeline
 import pandas as pd
 import ast
+import logging
+from collections import defaultdict
+from functools import lru_cache
+from .. import config
+from ..preprocess.selection import select_representative
 
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0)
 
-def generate_summaries(df, num_sentences=5):
-    summaries = []
-    grouped = df.groupby(["app", "category", "sentiment"])
+@lru_cache(maxsize=None)
+def get_summarizer(model=config.SUMMARY_MODEL, device=None):
+    """
+    Builds the summarization pipeline on first use. Uses the first GPU when
+    one is available and falls back to CPU otherwise.
+    """
+    import torch
+    from transformers import pipeline
 
-    for (app, category, sentiment), group in grouped:
+    if device is None:
+        device = 0 if torch.cuda.is_available() else -1
+    logging.info(f"📦 Loading summarizer '{model}' on {'cuda:0' if device >= 0 else 'cpu'}")
+    return pipeline("summarization", model=model, device=device)
+
+
+def _flatten_group(group):
+    flat_reviews, flat_aspects, flat_opinions = [], [], []
+
+    for r in group["reviews"].tolist():
+        if isinstance(r, str):
+            try:
+                parsed = ast.literal_eval(r) if r.startswith("[") else [r]
+                flat_reviews.extend([str(s).strip() for s in parsed if str(s).strip()])
+            except Exception as e:
+                print(f"⚠️ Skipping malformed review: {r} — {e}")
+        elif isinstance(r, list):
+            flat_reviews.extend([str(s).strip() for s in r if str(s).strip()])
+
+    for a_list in group["aspects"].tolist():
         try:
-            reviews = group["reviews"].tolist()
-            aspects = group["aspects"].tolist()
-            opinions = group["opinions"].tolist()
+            parsed = ast.literal_eval(a_list) if isinstance(a_list, str) else a_list
+            flat_aspects.extend([a for a in parsed if a != "NULL"])
+        except:
+            pass
 
-            flat_reviews, flat_aspects, flat_opinions = [], [], []
+    for o_list in group["opinions"].tolist():
+        try:
+            parsed = ast.literal_eval(o_list) if isinstance(o_list, str) else o_list
+            flat_opinions.extend([o for o in parsed if o != "NULL"])
+        except:
+            pass
+
+    return flat_reviews, flat_aspects, flat_opinions
+
+
+def _length_limits(input_word_count):
+    max_len = min(130, int(input_word_count * 1.3))
+    min_len = max(5, int(max_len * 0.5))
+
+    # 🛑 Ensure min_len < max_len to avoid transformer error
+    if min_len >= max_len:
+        min_len = max(5, max_len - 1)
+    return max_len, min_len
+
+
+def _split_words(text, chunk_words):
+    words = text.split()
+    return [" ".join(words[i:i + chunk_words]) for i in range(0, len(words), chunk_words)]
+
+
+def _summarize_batch(texts, max_len, min_len, batch_size):
+    """Runs the summarizer over `texts`, `batch_size` inputs per call."""
+    summarizer = get_summarizer()
+    outputs = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        result = summarizer(batch, max_length=max_len, min_length=min_len, do_sample=False, truncation=True)
+        outputs.extend(r["summary_text"] for r in result)
+    return outputs
 
-            for r in reviews:
-                if isinstance(r, str):
-                    try:
-                        parsed = ast.literal_eval(r) if r.startswith("[") else [r]
-                        flat_reviews.extend([str(s).strip() for s in parsed if str(s).strip()])
-                    except Exception as e:
-                        print(f"⚠️ Skipping malformed review: {r} — {e}")
-                elif isinstance(r, list):
-                    flat_reviews.extend([str(s).strip() for s in r if str(s).strip()])
-
-            for a_list in aspects:
-                try:
-                    parsed = ast.literal_eval(a_list) if isinstance(a_list, str) else a_list
-                    flat_aspects.extend([a for a in parsed if a != "NULL"])
-                except:
-                    pass
-
-            for o_list in opinions:
-                try:
-                    parsed = ast.literal_eval(o_list) if isinstance(o_list, str) else o_list
-                    flat_opinions.extend([o for o in parsed if o != "NULL"])
-                except:
-                    pass
-
-            combined_text = " ".join(flat_reviews)
-            input_word_count = len(combined_text.split())
-            print(f"[Summary] ({app}, {category}, {sentiment}) → {input_word_count} words")
 
-            if input_word_count < 5:
-                summary = combined_text
-            else:
-                max_len = min(130, int(input_word_count * 1.3))
-                min_len = max(5, int(max_len * 0.5))
+def _condense(texts, chunk_words, batch_size):
+    """
+    Map-reduce for inputs longer than BART's window: each text is split into
+    window-sized pieces, every piece is summarized, and the joined partial
+    summaries are condensed again until each text fits in one window.
+    """
+    texts = list(texts)
+    while True:
+        long_idx = [i for i, t in enumerate(texts) if len(t.split()) > chunk_words]
+        if not long_idx:
+            return texts
 
-                # 🛑 Ensure min_len < max_len to avoid transformer error
-                if min_len >= max_len:
-                    min_len = max(5, max_len - 1)
+        pieces, owners = [], []
+        for i in long_idx:
+            for piece in _split_words(texts[i], chunk_words):
+                pieces.append(piece)
+                owners.append(i)
 
-                result = summarizer(combined_text, max_length=max_len, min_length=min_len, do_sample=False)
-                summary = result[0]["summary_text"]
+        partials = _summarize_batch(pieces, 130, 30, batch_size)
+        joined = defaultdict(list)
+        for owner, partial in zip(owners, partials):
+            joined[owner].append(partial)
+        for i in long_idx:
+            texts[i] = " ".join(joined[i])
 
-                
-            summaries.append({
+
+def _condense_one(record, text, chunk_words, batch_size):
+    # A failing group is left without a summary so the others still go through
+    try:
+        return _condense([text], chunk_words, batch_size)[0]
+    except Exception as e:
+        print(f"⚠️ Error summarizing ({record['app']}, {record['category']}, {record['sentiment']}): {e}")
+        return None
+
+
+def generate_summaries(df, num_sentences=5, batch_size=config.SUMMARY_BATCH_SIZE,
+                       chunk_words=config.SUMMARY_CHUNK_WORDS, cache=None):
+    """
+    Summarizes each (app, category, sentiment) group.
+
+    Groups with the same length limits are batched into single pipeline
+    calls, over-long inputs are condensed with map-reduce instead of being
+    truncated, and when a `cache` is given, groups whose review set hasn't
+    changed reuse their stored summary. The returned `cached` column marks
+    those so they don't need to be upserted again.
+    """
+    records, pending = [], []
+    grouped = df.groupby(["app", "category", "sentiment"])
+
+    for (app, category, sentiment), group in grouped:
+        try:
+            flat_reviews, flat_aspects, flat_opinions = _flatten_group(group)
+            selected = flat_reviews
+            if config.SUMMARY_PRESELECT:
+                # Keeps BART's input bounded while still drawing from the whole group
+                selected = select_representative(list(dict.fromkeys(flat_reviews)))
+            combined_text = " ".join(selected)
+            input_word_count = len(combined_text.split())
+            print(f"[Summary] ({app}, {category}, {sentiment}) → {input_word_count} words "
+                  f"from {len(selected)}/{len(flat_reviews)} reviews")
+
+            record = {
                 "app": app,
                 "category": category,
                 "sentiment": sentiment,
-                "summary": summary,
-                "aspects": ", ".join(set(flat_aspects)),
-                "opinions": ", ".join(set(flat_opinions))
-            })
+                "summary": None,
+                "aspects": ", ".join(dict.fromkeys(flat_aspects)),
+                "opinions": ", ".join(dict.fromkeys(flat_opinions)),
+                "cached": False,
+            }
+            cache_key = None
+            if cache is not None:
+                review_set = "\n".join(sorted(set(flat_reviews)))
+                cache_key = cache.key(f"{app}\x00{category}\x00{sentiment}\x00{review_set}")
+            records.append((record, cache_key, combined_text, input_word_count))
 
         except Exception as e:
             print(f"⚠️ Error summarizing ({app}, {category}, {sentiment}): {e}")
 
-    return pd.DataFrame(summaries)
+    hits = cache.get_many([key for *_, key, _, _ in records]) if cache is not None else {}
+    for pos, (record, cache_key, combined_text, input_word_count) in enumerate(records):
+        if cache_key in hits:
+            record["summary"] = hits[cache_key]["summary"]
+            record["cached"] = True
+        elif input_word_count < 5:
+            record["summary"] = combined_text
+        else:
+            pending.append((pos, combined_text, _length_limits(input_word_count)))
+
+    # Condense long inputs, then bucket by identical length limits and sort
+    # by input length so each batch pads to a similar size.
+    if pending:
+        try:
+            condensed = _condense([text for _, text, _ in pending], chunk_words, batch_size)
+        except Exception as e:
+            print(f"⚠️ Batch condensing failed ({e}), retrying groups one by one")
+            condensed = [_condense_one(records[pos][0], text, chunk_words, batch_size) for pos, text, _ in pending]
+        buckets = defaultdict(list)
+        for (pos, _, limits), text in zip(pending, condensed):
+            if text is not None:
+                buckets[limits].append((pos, text))
+
+        for (max_len, min_len), items in buckets.items():
+            items.sort(key=lambda item: len(item[1]))
+            try:
+                outputs = _summarize_batch([text for _, text in items], max_len, min_len, batch_size)
+            except Exception as e:
+                print(f"⚠️ Batch summarization failed ({e}), retrying groups one by one")
+                outputs = []
+                for pos, text in items:
+                    try:
+                        outputs.append(_summarize_batch([text], max_len, min_len, 1)[0])
+                    except Exception as e:
+                        record = records[pos][0]
+                        print(f"⚠️ Error summarizing ({record['app']}, {record['category']}, {record['sentiment']}): {e}")
+                        outputs.append(None)
+            for (pos, _), summary in zip(items, outputs):
+                records[pos][0]["summary"] = summary
+
+    summaries = [record for record, *_ in records if record["summary"] is not None]
+    if cache is not None:
+        cache.put_many([(key, {"summary": record["summary"]})
+                        for record, key, *_ in records if record["summary"] is not None and not record["cached"]])
+        cache.log_stats()
+
+    return pd.DataFrame(summaries, columns=["app", "category", "sentiment", "summary", "aspects", "opinions", "cached"])
@@ -1,9 +1,21 @@
 import logging 
 
-def clean_reviews_for_model(df):
+# Reviews with fewer words are too short to predict on
+MIN_WORDS = 3
+
+
+def passes_cleaning(content):
+    """Whether clean_reviews_for_model would keep a review with this content."""
+    return content is not None and len(str(content).split()) >= MIN_WORDS
+
+
+def clean_reviews_for_model(df, keep_score=False):
     logging.info("🧹 Cleaning review data for prediction...")
     df.dropna(subset=["content"], inplace=True)
     df["content"] = df["content"].astype(str).str.strip()
-    df = df[df["content"].str.split().str.len() > 2]  # Remove very short reviews
+    df = df[df["content"].str.split().str.len() >= MIN_WORDS]  # Remove very short reviews
     df.reset_index(drop=True, inplace=True)
+    # The star rating is only needed by tiered extraction's fast path
+    if keep_score and "score" in df.columns:
+        return df[["content", "app", "score"]]
     return df[["content", "app"]]
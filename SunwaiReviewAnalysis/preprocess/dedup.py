@@ -0,0 +1,63 @@
+import itertools
+import numpy as np
+import pandas as pd
+from .. import config
+
+_BITS = np.arange(64, dtype=np.uint64)
+_CHUNK_TOKENS = 65_536
+
+
+def simhash(texts):
+    """64-bit SimHash of each text's lower-cased word tokens, as uint64."""
+    tokens = pd.Series(texts, dtype=object).fillna("").astype(str).str.lower().str.findall(r"\w+")
+    lengths = tokens.str.len().to_numpy()
+    hashes = np.zeros(len(tokens), dtype=np.uint64)
+    if not lengths.sum():
+        return hashes
+
+    flat = np.empty(lengths.sum(), dtype=object)
+    flat[:] = list(itertools.chain.from_iterable(tokens))
+    token_hashes = pd.util.hash_array(flat)
+
+    # +1 for every set bit, -1 for every clear bit, summed per review. Tokens
+    # are processed in fixed-size chunks so the tokens x 64 vote matrix never
+    # has to exist in full; rows spanning a chunk boundary are summed in parts.
+    has_tokens = lengths > 0
+    rows = np.repeat(np.arange(has_tokens.sum()), lengths[has_tokens])
+    sums = np.zeros((has_tokens.sum(), 64), dtype=np.int32)
+    for start in range(0, len(token_hashes), _CHUNK_TOKENS):
+        chunk_rows = rows[start:start + _CHUNK_TOKENS]
+        votes = ((token_hashes[start:start + _CHUNK_TOKENS, None] >> _BITS) & np.uint64(1)).astype(np.int32) * 2 - 1
+        starts = np.flatnonzero(np.r_[True, chunk_rows[1:] != chunk_rows[:-1]])
+        sums[chunk_rows[starts]] += np.add.reduceat(votes, starts, axis=0)
+
+    hashes[has_tokens] = ((sums > 0).astype(np.uint64) << _BITS).sum(axis=1, dtype=np.uint64)
+    return hashes
+
+
+def near_duplicate_mask(texts, groups=None, max_distance=config.NEAR_DUP_MAX_DISTANCE):
+    """
+    Flags texts whose SimHash is within `max_distance` bits of an earlier
+    text in the same group. Hashes are split into `max_distance + 1` bands,
+    so any pair that close must share at least one band exactly and only
+    those candidates are compared.
+    """
+    hashes = [int(h) for h in simhash(texts)]
+    groups = [None] * len(hashes) if groups is None else list(groups)
+    n_bands = max_distance + 1
+    width = 64 // n_bands
+    band_mask = (1 << width) - 1
+
+    buckets = {}
+    duplicate = np.zeros(len(hashes), dtype=bool)
+    for i, (h, group) in enumerate(zip(hashes, groups)):
+        if h == 0:
+            continue
+        keys = [(group, b, (h >> (b * width)) & band_mask) for b in range(n_bands)]
+        candidates = {j for key in keys for j in buckets.get(key, ())}
+        if any((h ^ hashes[j]).bit_count() <= max_distance for j in candidates):
+            duplicate[i] = True
+            continue
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+    return duplicate
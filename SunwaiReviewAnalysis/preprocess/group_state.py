@@ -0,0 +1,189 @@
+import logging
+import sqlite3
+import time
+from collections import Counter
+import pandas as pd
+from .. import config
+from ..datastore.key_index import hash_review_keys
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_texts (
+    hash INTEGER PRIMARY KEY,
+    content TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    members INTEGER NOT NULL DEFAULT 0,
+    dirty INTEGER NOT NULL DEFAULT 0,
+    claimed_by TEXT,
+    claimed_at REAL,
+    PRIMARY KEY (app, category, sentiment)
+);
+CREATE TABLE IF NOT EXISTS group_members (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    review_hash INTEGER NOT NULL,
+    PRIMARY KEY (app, category, sentiment, review_hash)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS group_terms (
+    app TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sentiment TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (app, category, sentiment, kind, term)
+) WITHOUT ROWID;
+"""
+
+
+class GroupState:
+    """
+    Persistent (app, category, sentiment) groups across runs: member review
+    hashes, the review texts, and aspect/opinion frequency counters. Merging
+    a run's grouped reviews marks only groups that gained members as dirty.
+
+    Several workers may share the file: each merge holds SQLite's write
+    lock for its whole read-check-insert, a worker claims the dirty groups
+    it summarizes so no other worker summarizes them too, and a group is
+    only marked clean if no members arrived after it was read.
+    """
+
+    def __init__(self, path=config.GROUP_STATE_PATH):
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript(SCHEMA)
+        columns = {name for _, name, *_ in self.conn.execute("PRAGMA table_info(groups)")}
+        if "claimed_by" not in columns:
+            # State files written before groups could be claimed
+            with self.conn:
+                self.conn.execute("ALTER TABLE groups ADD COLUMN claimed_by TEXT")
+                self.conn.execute("ALTER TABLE groups ADD COLUMN claimed_at REAL")
+
+    def close(self):
+        self.conn.close()
+
+    def _members(self, key, hashes):
+        found = set()
+        hashes = list(set(hashes))
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(h for (h,) in self.conn.execute(
+                "SELECT review_hash FROM group_members WHERE app = ? AND category = ? AND sentiment = ? "
+                f"AND review_hash IN ({placeholders})", (*key, *chunk)))
+        return found
+
+    def merge(self, group_df):
+        """Merges grouped reviews; returns the keys of groups that changed."""
+        touched = []
+        with self.conn:
+            # Taken up front so membership checks can't race another writer
+            self.conn.execute("BEGIN IMMEDIATE")
+            for row in group_df.itertuples(index=False):
+                key = (str(row.app), str(row.category), str(row.sentiment))
+                hashes = [int(h) for h in hash_review_keys(row.reviews)]
+                known = self._members(key, hashes)
+
+                new_members = {}
+                aspects, opinions = Counter(), Counter()
+                for h, content, aspect, opinion in zip(hashes, row.reviews, row.aspects, row.opinions):
+                    if h in known:
+                        continue
+                    new_members[h] = content
+                    if aspect != "NULL":
+                        aspects[aspect] += 1
+                    if opinion != "NULL":
+                        opinions[opinion] += 1
+                if not new_members:
+                    continue
+
+                self.conn.executemany("INSERT OR IGNORE INTO review_texts (hash, content) VALUES (?, ?)",
+                                      new_members.items())
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO group_members (app, category, sentiment, review_hash) VALUES (?, ?, ?, ?)",
+                    [(*key, h) for h in new_members])
+                for kind, counter in (("aspect", aspects), ("opinion", opinions)):
+                    self.conn.executemany(
+                        "INSERT INTO group_terms (app, category, sentiment, kind, term, count) VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (app, category, sentiment, kind, term) DO UPDATE SET count = count + excluded.count",
+                        [(*key, kind, str(term), n) for term, n in counter.items()])
+                self.conn.execute(
+                    "INSERT INTO groups (app, category, sentiment, members, dirty) VALUES (?, ?, ?, ?, 1) "
+                    "ON CONFLICT (app, category, sentiment) DO UPDATE SET members = members + excluded.members, dirty = 1",
+                    (*key, len(new_members)))
+                touched.append(key)
+
+        logging.info(f"🧮 Merged run into group state: {len(touched)} of {len(group_df)} groups changed")
+        return touched
+
+    def claim(self, owner, keys=None, limit=None, lease_seconds=config.QUEUE_LEASE_SECONDS):
+        """
+        Claims dirty groups for `owner` and returns their keys: those among
+        `keys` if given, at most `limit` of them. Groups claimed by another
+        owner are skipped until their claim is `lease_seconds` old.
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT app, category, sentiment FROM groups WHERE dirty = 1 "
+                "AND (claimed_by IS NULL OR claimed_at < ?)", (now - lease_seconds,)).fetchall()
+            if keys is not None:
+                wanted = {tuple(k) for k in keys}
+                rows = [row for row in rows if row in wanted]
+            rows = rows[:limit]
+            self.conn.executemany(
+                "UPDATE groups SET claimed_by = ?, claimed_at = ? WHERE app = ? AND category = ? AND sentiment = ?",
+                [(owner, now, *row) for row in rows])
+        return rows
+
+    def release(self, owner):
+        """Drops `owner`'s claims; groups still dirty can then be claimed again."""
+        with self.conn:
+            self.conn.execute("UPDATE groups SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?", (owner,))
+
+    def dirty_groups(self, keys=None):
+        """
+        Frame of every changed group (or of those among `keys`) in the shape
+        generate_summaries expects, covering the group's full history.
+        Aspects/opinions are ordered by frequency, and `members` is the
+        group's size when it was read.
+        """
+        rows = self.conn.execute("SELECT app, category, sentiment, members FROM groups WHERE dirty = 1").fetchall()
+        if keys is not None:
+            wanted = {tuple(k) for k in keys}
+            rows = [row for row in rows if tuple(row[:3]) in wanted]
+        records = []
+        for *key, members in rows:
+            reviews = [c for (c,) in self.conn.execute(
+                "SELECT t.content FROM group_members m JOIN review_texts t ON t.hash = m.review_hash "
+                "WHERE m.app = ? AND m.category = ? AND m.sentiment = ?", key)]
+            terms = {"aspect": [], "opinion": []}
+            for kind, term in self.conn.execute(
+                    "SELECT kind, term FROM group_terms WHERE app = ? AND category = ? AND sentiment = ? "
+                    "ORDER BY count DESC, term", key):
+                terms[kind].append(term)
+            records.append({
+                "app": key[0], "category": key[1], "sentiment": key[2],
+                "reviews": reviews, "aspects": terms["aspect"], "opinions": terms["opinion"],
+                "members": members,
+            })
+        return pd.DataFrame(records, columns=["app", "category", "sentiment", "reviews", "aspects", "opinions", "members"])
+
+    def mark_clean(self, keys, members=None):
+        """
+        Clears the dirty flag of `keys`. With `members` (key -> size as read
+        by dirty_groups), groups that have grown since stay dirty.
+        """
+        with self.conn:
+            if members is None:
+                self.conn.executemany(
+                    "UPDATE groups SET dirty = 0 WHERE app = ? AND category = ? AND sentiment = ?",
+                    [tuple(k) for k in keys])
+            else:
+                self.conn.executemany(
+                    "UPDATE groups SET dirty = 0 WHERE app = ? AND category = ? AND sentiment = ? AND members = ?",
+                    [(*k, members[tuple(k)]) for k in keys if tuple(k) in members])
@@ -1,6 +1,7 @@
 import ast
+import itertools
 import logging 
-from collections import defaultdict
+import numpy as np
 import pandas as pd
 # Fix parsing of lists in 'aspects' and 'opinions' columns
 def safe_parse_list(x):
@@ -11,6 +12,9 @@ def safe_parse_list(x):
             return []
     elif isinstance(x, list):
         return x
+    elif isinstance(x, (tuple, np.ndarray)):
+        # Parquet list columns come back as arrays
+        return list(x)
     else:
         return []
 
@@ -72,66 +76,253 @@ bank_category_map = {
     "CHARTER#GENERAL": "FEES_POLICY_COMPLAINTS",
 }
 
+UNMAPPED_CATEGORY = "Miscellaneous"
+
+
+def _normalize_category(cat):
+    # Case- and whitespace-insensitive: " software # general " -> "SOFTWARE#GENERAL"
+    return "".join(str(cat).split()).upper()
+
+
+# Compiled once: every mapped label gets a small integer code, and raw keys
+# are looked up in their normalized form.
+MAPPED_CATEGORY_DTYPE = pd.CategoricalDtype(
+    sorted(set(bank_category_map.values())) + [UNMAPPED_CATEGORY]
+)
+_UNMAPPED_CODE = len(MAPPED_CATEGORY_DTYPE.categories) - 1
+_category_codes = {
+    _normalize_category(raw): MAPPED_CATEGORY_DTYPE.categories.get_loc(label)
+    for raw, label in bank_category_map.items()
+}
+
+
+def _compile(raw_categories):
+    # Normalization and lookup run once per unique raw value. Missing values
+    # are factorized to -1, which lands on the trailing unmapped slot.
+    raw_codes, uniques = pd.factorize(np.asarray(raw_categories, dtype=object))
+    lookup = np.array(
+        [_category_codes.get(_normalize_category(u), _UNMAPPED_CODE) for u in uniques] + [_UNMAPPED_CODE],
+        dtype=np.int16,
+    )
+    return raw_codes, uniques, lookup
+
+
+def _unmapped_counts(raw_codes, uniques, lookup):
+    counts = np.bincount(raw_codes + 1, minlength=len(uniques) + 1)
+    names = np.concatenate([["<missing>"], np.asarray(uniques, dtype=object)])
+    unmapped = np.concatenate([[_UNMAPPED_CODE], lookup[:-1]]) == _UNMAPPED_CODE
+    unmapped &= counts > 0
+    return pd.Series(counts[unmapped], index=names[unmapped], name="count").sort_values(ascending=False, kind="stable")
+
+
+def map_category_codes(raw_categories):
+    """
+    Maps a flat array of raw categories (e.g. the exploded quads) to a
+    Categorical of mapped labels with a single NumPy take.
+    """
+    raw_codes, _, lookup = _compile(raw_categories)
+    return pd.Categorical.from_codes(lookup[raw_codes], dtype=MAPPED_CATEGORY_DTYPE)
+
+
+def unmapped_categories(raw_categories):
+    """Counts of raw categories that fall through to UNMAPPED_CATEGORY, most frequent first."""
+    return _unmapped_counts(*_compile(raw_categories))
+
+
 def map_categories(raw_category_list):
-    return [bank_category_map.get(cat.strip(), "Miscellaneous") for cat in raw_category_list]
+    return list(map_category_codes(raw_category_list).astype(object))
+
 
 def parse_and_map(df):
-    df["categories"] = df["categories"].apply(safe_parse_list)
-    df["mapped_categories"] = df["categories"].apply(map_categories)
+    categories = [safe_parse_list(x) for x in df["categories"]]
+    df["categories"] = categories
+
+    # Map the exploded categories in one pass, then split back into per-row
+    # lists. The lists share the interned label strings.
+    lengths = np.fromiter(map(len, categories), dtype=np.int64, count=len(categories))
+    flat = np.empty(lengths.sum(), dtype=object)
+    flat[:] = list(itertools.chain.from_iterable(categories))
+    raw_codes, uniques, lookup = _compile(flat)
+    labels = np.asarray(MAPPED_CATEGORY_DTYPE.categories, dtype=object)[lookup[raw_codes]].tolist()
+    ends = np.cumsum(lengths).tolist()
+    df["mapped_categories"] = [labels[end - n:end] for end, n in zip(ends, lengths.tolist())]
+
+    _warn_unmapped(_unmapped_counts(raw_codes, uniques, lookup))
     return df
 
-def group_reviews_by_app_category_sentiment(df):
-    logging.info("📊 Grouping reviews by app, category, and sentiment...")
-    grouped_data = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {
-        "reviews": [],
-        "aspects": [],
-        "opinions": []
-    })))
-
-    for _, row in df.iterrows():
-        app = str(row.get("app", "")).strip()
-        content = str(row.get("content", "")).strip()
-        if len(content.split()) <= 1:
-            continue
 
+def check_store_categories(store):
+    """
+    parse_and_map for a QuadStore: its categories are mapped lazily, so this
+    only warns about raw categories that fall through to UNMAPPED_CATEGORY.
+    """
+    # The pool holds each raw category once, so the store's ids are its codes
+    _, uniques, lookup = _compile(store.categories.values)
+    _warn_unmapped(_unmapped_counts(store.category_ids, uniques, lookup))
+
+
+def _warn_unmapped(unmapped):
+    if len(unmapped):
+        top = ", ".join(f"{cat!r} ({n})" for cat, n in unmapped.head(10).items())
+        logging.warning(f"⚠️ {int(unmapped.sum())} quads with {len(unmapped)} unmapped raw categories: {top}")
+
+def _as_list(x):
+    # Like safe_parse_list, but returns None for unparseable cells so the
+    # row can be skipped, matching the old literal_eval behaviour.
+    if isinstance(x, list):
+        return x
+    if isinstance(x, (tuple, np.ndarray)):
+        return list(x)
+    if isinstance(x, str):
         try:
-            categories = ast.literal_eval(str(row.get("mapped_categories", [])))
-            sentiments = ast.literal_eval(str(row.get("sentiments", [])))
-            aspects = ast.literal_eval(str(row.get("aspects", [])))
-            opinions = ast.literal_eval(str(row.get("opinions", [])))
-        except Exception as e:
-            logging.warning(f"Skipping row due to eval error: {e}")
-            continue
-
-        for i in range(min(len(categories), len(sentiments))):
-            cat = categories[i]
-            sent = sentiments[i]
-            asp = aspects[i] if i < len(aspects) else "NULL"
-            opn = opinions[i] if i < len(opinions) else "NULL"
-
-            grouped_entry = grouped_data[app][cat][sent]
-            grouped_entry["reviews"].append(content)
-            grouped_entry["aspects"].append(asp)
-            grouped_entry["opinions"].append(opn)
-
-    records = []
-    for app, cat_dict in grouped_data.items():
-        for cat, sent_dict in cat_dict.items():
-            for sentiment, data in sent_dict.items():
-                records.append({
-                    "app": app,
-                    "category": cat,
-                    "sentiment": sentiment,
-                    "reviews": data["reviews"],
-                    "aspects": data["aspects"],
-                    "opinions": data["opinions"]
-                })
-
-    grouped_df = pd.DataFrame(records)
+            parsed = ast.literal_eval(x)
+        except Exception:
+            return None
+        return parsed if isinstance(parsed, list) else None
+    return None
+
+
+def _column_lists(df, column):
+    if column not in df.columns:
+        return pd.Series([[]] * len(df), index=df.index, dtype=object)
+    return df[column].map(_as_list)
+
+
+def _take_aligned(lists, counts, fill=None):
+    """
+    Flattens a column of lists, keeping only the first `counts[i]` items of
+    row i. Rows shorter than their count are padded with `fill`.
+    """
+    lengths = lists.map(len).to_numpy()
+    flat = np.empty(lengths.sum(), dtype=object)
+    flat[:] = list(itertools.chain.from_iterable(lists))
+    starts = np.cumsum(lengths) - lengths
+
+    total = counts.sum()
+    positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    in_range = positions < np.repeat(lengths, counts)
+
+    out = np.full(total, fill, dtype=object)
+    out[in_range] = flat[(np.repeat(starts, counts) + positions)[in_range]]
+    return out
+
+
+def explode_quads(df):
+    """
+    One row per quad (app, category, sentiment, reviews, aspects, opinions),
+    using mapped categories. Rows whose lists can't be parsed or whose
+    content is a single word are skipped. Returns None when no quads remain.
+    """
+    apps = df["app"].astype(str).str.strip() if "app" in df.columns else pd.Series("", index=df.index)
+    contents = df["content"].astype(str).str.strip() if "content" in df.columns else pd.Series("", index=df.index)
+
+    columns = {name: _column_lists(df, name) for name in ("mapped_categories", "sentiments", "aspects", "opinions")}
+    parsed_ok = pd.concat([col.notna() for col in columns.values()], axis=1).all(axis=1)
+    has_words = contents.str.split().str.len() > 1
+    skipped = int((has_words & ~parsed_ok).sum())
+    if skipped:
+        logging.warning(f"Skipping {skipped} rows due to eval error")
+
+    keep = has_words & parsed_ok
+    apps, contents = apps[keep], contents[keep]
+    columns = {name: col[keep] for name, col in columns.items()}
+
+    counts = np.minimum(columns["mapped_categories"].map(len).to_numpy(),
+                        columns["sentiments"].map(len).to_numpy()).astype(np.int64)
+    if counts.sum() == 0:
+        return None
+
+    return pd.DataFrame({
+        "app": np.repeat(apps.to_numpy(dtype=object), counts),
+        "category": _take_aligned(columns["mapped_categories"], counts),
+        "sentiment": _take_aligned(columns["sentiments"], counts),
+        "reviews": np.repeat(contents.to_numpy(dtype=object), counts),
+        "aspects": _take_aligned(columns["aspects"], counts, fill="NULL"),
+        "opinions": _take_aligned(columns["opinions"], counts, fill="NULL"),
+    })
+
+
+def explode_quad_store(store, df):
+    """
+    explode_quads for a QuadStore whose reviews are the rows of `df`
+    (which only needs `app` and `content`). Categories are mapped once per
+    distinct raw value and strings are taken from the store's pools.
+    """
+    apps = df["app"].astype(str).str.strip().to_numpy(dtype=object) if "app" in df.columns else np.full(len(df), "", dtype=object)
+    contents = df["content"].astype(str).str.strip()
+    review = store.review_index()
+    keep = (contents.str.split().str.len() > 1).to_numpy()[review]
+    if not keep.any():
+        return None
+
+    def strings(ids, pool):
+        return np.asarray(pool.values, dtype=object)[ids[keep]]
+
+    mapped = store.mapped_categories()
+    return pd.DataFrame({
+        "app": apps[review[keep]],
+        "category": np.asarray(mapped.categories, dtype=object)[mapped.codes[keep]],
+        "sentiment": strings(store.polarity_codes, store.polarities),
+        "reviews": contents.to_numpy(dtype=object)[review[keep]],
+        "aspects": strings(store.aspect_ids, store.aspects),
+        "opinions": strings(store.opinion_ids, store.opinions),
+    })
+
+
+def group_reviews_by_app_category_sentiment(df, quads=None):
+    """
+    Groups quads by (app, category, sentiment). When a QuadStore for the
+    rows of `df` is given, it is used instead of the list columns.
+    """
+    logging.info("📊 Grouping reviews by app, category, and sentiment...")
+
+    quads = explode_quads(df) if quads is None else explode_quad_store(quads, df)
+    if quads is None:
+        logging.info("✅ Grouped DataFrame created.")
+        return pd.DataFrame([])
+
+    # Groups are ordered app -> category -> sentiment by first appearance,
+    # the same order the old nested-dict implementation produced.
+    quads["_pos"] = np.arange(len(quads))
+    quads["_app_pos"] = quads.groupby("app", sort=False, dropna=False)["_pos"].transform("min")
+    quads["_cat_pos"] = quads.groupby(["app", "category"], sort=False, dropna=False)["_pos"].transform("min")
+
+    keys = ["app", "category", "sentiment"]
+    grouped_df = (
+        quads.groupby(keys, sort=False, dropna=False)
+        .agg(
+            reviews=("reviews", list),
+            aspects=("aspects", list),
+            opinions=("opinions", list),
+            _app_pos=("_app_pos", "first"),
+            _cat_pos=("_cat_pos", "first"),
+            _pos=("_pos", "first"),
+        )
+        .reset_index()
+        .sort_values(["_app_pos", "_cat_pos", "_pos"], kind="stable")
+        .drop(columns=["_app_pos", "_cat_pos", "_pos"])
+        .reset_index(drop=True)
+    )
     logging.info("✅ Grouped DataFrame created.")
     return grouped_df
 
 
+def merge_grouped_reviews(grouped_frames):
+    """
+    Combines outputs of group_reviews_by_app_category_sentiment computed on
+    separate chunks, concatenating the per-group lists.
+    """
+    frames = [f for f in grouped_frames if not f.empty]
+    if not frames:
+        return pd.DataFrame([])
+    combined = pd.concat(frames, ignore_index=True)
+    return (
+        combined.groupby(["app", "category", "sentiment"], sort=False, dropna=False)
+        .agg({col: lambda lists: list(itertools.chain.from_iterable(lists)) for col in ("reviews", "aspects", "opinions")})
+        .reset_index()
+    )
+
+
 # def group_reviews_by_app_category_sentiment(df):
 #     logging.info("📊 Grouping reviews by app, category, and sentiment...")
 #     grouped_reviews = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
@@ -0,0 +1,86 @@
+import itertools
+import numpy as np
+import pandas as pd
+from .. import config
+from .dedup import near_duplicate_mask
+
+
+class TfidfRows:
+    """
+    L2-normalized TF-IDF vectors (sublinear tf, smoothed idf) over
+    lower-cased word tokens, stored as CSR arrays so memory and every
+    product stay proportional to the number of non-zero terms.
+    """
+
+    def __init__(self, texts):
+        tokens = pd.Series(texts, dtype=object).fillna("").astype(str).str.lower().str.findall(r"\w+")
+        lengths = tokens.str.len().to_numpy(dtype=np.int64)
+        flat = np.empty(lengths.sum(), dtype=object)
+        flat[:] = list(itertools.chain.from_iterable(tokens))
+        terms, vocab = pd.factorize(flat)
+
+        # One entry per (row, term), sorted by row, with its count
+        pairs = (pd.DataFrame({"row": np.repeat(np.arange(len(tokens)), lengths), "term": terms})
+                 .value_counts(sort=False).sort_index().reset_index(name="count"))
+        self.n_terms = len(vocab)
+        self.indices = pairs["term"].to_numpy()
+        self.rows = pairs["row"].to_numpy()
+        self.indptr = np.searchsorted(self.rows, np.arange(len(tokens) + 1))
+
+        doc_freq = np.bincount(self.indices, minlength=self.n_terms)
+        idf = np.log((1 + len(tokens)) / (1 + doc_freq)) + 1
+        data = (1 + np.log(pairs["count"].to_numpy())) * idf[self.indices]
+        norms = np.sqrt(np.bincount(self.rows, weights=data ** 2, minlength=len(tokens)))
+        self.data = data / np.where(norms == 0, 1, norms)[self.rows]
+        self.n_rows = len(tokens)
+
+    def dot(self, vector):
+        """Product with a dense term vector, one value per row."""
+        return np.bincount(self.rows, weights=self.data * vector[self.indices], minlength=self.n_rows)
+
+    def row(self, i):
+        vector = np.zeros(self.n_terms)
+        vector[self.indices[self.indptr[i]:self.indptr[i + 1]]] = self.data[self.indptr[i]:self.indptr[i + 1]]
+        return vector
+
+    def centroid(self):
+        vector = np.bincount(self.indices, weights=self.data, minlength=self.n_terms)
+        return vector / (np.linalg.norm(vector) or 1)
+
+
+def select_representative(texts, budget_words=config.SUMMARY_SELECT_WORDS, mmr_lambda=config.SUMMARY_MMR_LAMBDA):
+    """
+    Picks reviews that are central to the group (cosine to the TF-IDF
+    centroid) but not redundant with each other (maximal marginal
+    relevance), until `budget_words` is used. Near-duplicates are dropped
+    first. Returns the chosen texts, most representative first.
+    """
+    texts = [t for t in texts if str(t).strip()]
+    if sum(len(str(t).split()) for t in texts) <= budget_words:
+        return texts
+
+    texts = [t for t, dup in zip(texts, near_duplicate_mask(texts)) if not dup]
+    words = np.array([len(str(t).split()) for t in texts])
+    vectors = TfidfRows(texts)
+    relevance = vectors.dot(vectors.centroid())
+
+    selected = []
+    redundancy = np.zeros(len(texts))
+    available = np.ones(len(texts), dtype=bool)
+    remaining = budget_words
+    while True:
+        available &= words <= remaining
+        if not available.any():
+            break
+        score = np.where(available, mmr_lambda * relevance - (1 - mmr_lambda) * redundancy, -np.inf)
+        best = int(np.argmax(score))
+        selected.append(best)
+        available[best] = False
+        remaining -= words[best]
+        redundancy = np.maximum(redundancy, vectors.dot(vectors.row(best)))
+
+    if not selected:
+        # Every review is longer than the budget: keep the most central one
+        # and let the summarizer's map-reduce condense it
+        selected = [int(np.argmax(relevance))]
+    return [texts[i] for i in selected]
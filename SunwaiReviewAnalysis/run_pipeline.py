@@ -1,141 +1,378 @@
 from . import config
 from .datastore.loader import DataLoader
 from .models.ABSA import QuadrupleExtractor
-from .models.extractor import extract_quadruples
-from .datastore.saver import save_to_csv, upload_to_supabase, get_existing_reviews, save_summary_to_supabase
-from .preprocess.mapping import parse_and_map, group_reviews_by_app_category_sentiment
+from .models.extractor import extract_quadruples, extract_quadruples_tiered
+from .models.parallel import ExtractorPool
+from .datastore.cache import PredictionCache, extraction_settings
+from .datastore.saver import UploadError, save_to_csv, save_to_parquet, upload_to_supabase, save_summary_to_supabase
+from .datastore.key_index import get_review_index
+from .datastore.checkpoint import RunCheckpoint
+from .datastore.local_store import LocalStore, sync_in_background
+from .datastore.rollups import update_rollups
+from .metrics import RunMetrics, latency_percentiles
+from .models.quad_store import QuadStore
+from .preprocess.mapping import check_store_categories, group_reviews_by_app_category_sentiment, merge_grouped_reviews
 from .models.summary_model import generate_summaries
 import logging
+import os
 from .datastore.fetch_playstore import fetch_new_reviews
 from .preprocess.cleaning import clean_reviews_for_model
+from .preprocess.dedup import near_duplicate_mask
+from .preprocess.group_state import GroupState
 logging.basicConfig(
     level=logging.INFO,  # can use DEBUG, WARNING, ERROR
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
 class PipelineRunner:
-    def __init__(self, input_path=config.INPUT_CSV, output_path=config.OUTPUT_CSV, model_name=config.MODEL_NAME):
+    def __init__(self, input_path=config.INPUT_CSV, output_path=config.OUTPUT_CSV, model_name=config.MODEL_NAME,
+                 workers=config.WORKERS, cache_path=config.CACHE_PATH, run_id=None,
+                 checkpoint_every=config.CHECKPOINT_EVERY):
         self.input_path = input_path
         self.output_path = output_path
         self.model_name = model_name
+        self.workers = workers
+        self.cache_path = cache_path
+        self.checkpoint = RunCheckpoint(run_id)
+        self.checkpoint_every = checkpoint_every
+        self.metrics = RunMetrics(self.checkpoint.run_id)
+        self.sync_thread = None
         self.df = None
         self.content = None
+        # Quads of self.df's rows; list columns are only built for outputs
+        self.quads = None
         self.model = None
+        self.group_members = None
+        self.touched_groups = []
 
     def fetch_and_prepare_reviews(self):
+        if self.checkpoint.is_done("clean"):
+            logging.info("⏭️ Fetch and clean already done for this run, reusing checkpoint.")
+            df = self.checkpoint.load("clean")
+            df.to_csv(self.input_path, index=False)
+            return not df.empty
+
         logging.info("🌐 Fetching reviews from Play Store...")
-        app_list = ["app.com.brd","com.ofss.digx.mobile.obdx.bahl",
-                    "com.ofss.tx.meezan",
-                    "com.sbp.sbp_complaints_management",
-                    "com.hbl.android.hblmobilebanking"]
-        rename_map = {
-            "com.ofss.digx.mobile.obdx.bahl": "Al Habib",
-            "com.ofss.tx.meezan":"Meezan Bank",
-            "app.com.brd":"UBL Digital",
-            "com.sbp.sbp_complaints_management":"Sunwai",
-            "com.hbl.android.hblmobilebanking":"HBL",
-        }
-
-        df = fetch_new_reviews(app_list, reviews_per_app=2000)
+        if self.checkpoint.is_done("fetch"):
+            df = self.checkpoint.load("fetch")
+        else:
+            with self.metrics.stage("fetch") as stage:
+                df = fetch_new_reviews(config.APP_PACKAGES, reviews_per_app=2000)
+                stage.items_out = len(df)
+            self.checkpoint.save("fetch", df)
 
         if df.empty:
             logging.info("📭 No new reviews fetched from Play Store.")
             return False
 
-        df = clean_reviews_for_model(df)
-
-        df["app"] = df["app"].map(rename_map).fillna(df["app"]) 
+        with self.metrics.stage("clean", items_in=len(df)) as stage:
+            df = clean_reviews_for_model(df, keep_score=config.TIERED_EXTRACTION)
+            df["app"] = df["app"].map(config.APP_NAMES).fillna(df["app"])
+            stage.items_out = len(df)
 
         df.to_csv(self.input_path, index=False)
+        self.checkpoint.save("clean", df)
         logging.info(f"✅ Cleaned data saved to {self.input_path}")
         return True
     
     def load_data(self): 
+        if self.checkpoint.is_done("dedup"):
+            logging.info("⏭️ Dedup already done for this run, reusing checkpoint.")
+            self.df = self.checkpoint.load("dedup")
+            self.content = self.df["content"].astype(str).tolist()
+            return
         logging.info("Loading Data...")
         self.df, self.content = DataLoader.load_data(self.input_path)
-        self._filter_duplicates()  # 🆕 Add duplicate filtering
+        with self.metrics.stage("dedup", items_in=len(self.df)) as stage:
+            self._filter_duplicates()  # 🆕 Add duplicate filtering
+            stage.items_out = len(self.df)
+        self.checkpoint.save("dedup", self.df)
 
     def _filter_duplicates(self):
         logging.info("🔎 Checking for duplicate reviews in Supabase...")
 
-        existing_reviews = get_existing_reviews()
+        index = get_review_index()
 
-        if not existing_reviews:
+        if not len(index):
             logging.info("ℹ️ No existing reviews found in Supabase.")
-            return
-
-        existing_set = set()
-        skipped = 0
-        for r in existing_reviews:
-            content = r.get("content")
-            app = r.get("app")
-            if content and app:
-                existing_set.add((content.strip().lower(), app.strip().lower()))
-            else:
-                skipped += 1
-
-        logging.info(f"⚠️ Skipped {skipped} invalid existing reviews (missing content or app)")
+        else:
+            original_count = len(self.df)
+            self.df = self.df[~index.contains_many(self.df["content"], self.df["app"])]
+            filtered_count = original_count - len(self.df)
+            logging.info(f"✅ Filtered {filtered_count} duplicate reviews.")
 
-        original_count = len(self.df)
+        if config.USE_LOCAL_STORE:
+            # Reviews stored locally but not yet synced aren't in the index
+            store = LocalStore()
+            local = store.contains_many(self.df["content"], self.df["app"])
+            store.close()
+            self.df = self.df[~local]
+            logging.info(f"✅ Filtered {int(local.sum())} reviews already in the local store.")
 
-        self.df["content_lower"] = self.df["content"].str.strip().str.lower()
-        self.df["app_lower"] = self.df["app"].str.strip().str.lower()
+        if config.NEAR_DUP_DETECTION:
+            near = near_duplicate_mask(self.df["content"], groups=self.df["app"])
+            self.df = self.df[~near]
+            logging.info(f"✅ Filtered {int(near.sum())} near-duplicate reviews.")
 
-        self.df = self.df[
-            ~self.df.apply(
-                lambda row: (row["content_lower"], row["app_lower"]) in existing_set,
-                axis=1,
-            )
-        ]
-        filtered_count = original_count - len(self.df)
-        logging.info(f"✅ Filtered {filtered_count} duplicate reviews.")
-
-        self.df.drop(columns=["content_lower", "app_lower"], inplace=True)
         self.content = self.df["content"].tolist()
 
         
     def load_model(self):
+        if self.workers > 1:
+            # The pool is kept until the run ends, so each worker loads the model once
+            logging.info(f"🧵 Model will be loaded inside {self.workers} worker processes")
+            self.model = ExtractorPool(model_name=self.model_name, workers=self.workers)
+            return
         logging.info("loading Model...")
-        self.model = QuadrupleExtractor(model_name=self.model_name)
+        with self.metrics.stage("load_model", unit="models") as stage:
+            self.model = QuadrupleExtractor(model_name=self.model_name)
+            stage.items_out = 1
 
-    def extract(self):
-        logging.info("🔍 Extracting quadruples...")
-        aspects, opinions, sentiments, categories = extract_quadruples(self.content, self.model)
+    def _extract_with_checkpoints(self):
+        # Partial results are saved every `checkpoint_every` reviews so a
+        # resumed run continues from the last processed review.
+        done = self.checkpoint.load_partial("extract_partial", default=QuadStore())
+        if isinstance(done, tuple):
+            # Partial results saved as per-field lists by an older run
+            done = QuadStore.from_lists(*done)
+        if len(done):
+            logging.info(f"⏩ Resuming extraction at review {len(done)}/{len(self.content)}")
+
+        cache = PredictionCache(self.cache_path, model_name=self.model_name,
+                                settings=extraction_settings()) if self.cache_path else None
+        step = max(1, self.checkpoint_every)
+        scores = self._scores()
+        latencies, routing = [], {}
+        abandoned = getattr(self.model, "abandoned", 0)
+        with self.metrics.stage("extract", items_in=len(self.content) - len(done), unit="quads") as stage:
+            for start in range(len(done), len(self.content), step):
+                done.extend(self._extract(
+                    self.content[start:start + step], None if scores is None else scores[start:start + step],
+                    cache, latencies=latencies, routing=routing
+                ))
+                self.checkpoint.save_partial("extract_partial", done)
+            stage.items_out = done.n_quads
+            stage.extra.update(latency_percentiles(latencies), **routing)
+            # Worker processes report theirs through `routing`
+            stage.extra["abandoned"] = routing.get("abandoned", 0) + getattr(self.model, "abandoned", 0) - abandoned
+            if cache is not None:
+                stage.extra.update(cache_hits=cache.hits, cache_misses=cache.misses)
+        if cache is not None:
+            cache.close()
+        return done
+
+    def _scores(self):
+        if config.TIERED_EXTRACTION and "score" in self.df.columns:
+            return self.df["score"].tolist()
+        return None
+
+    def _extract(self, reviews, scores, cache, latencies=None, routing=None):
+        kwargs = dict(workers=self.workers, model_name=self.model_name, cache=cache, latencies=latencies)
+        if config.TIERED_EXTRACTION:
+            return QuadStore.from_lists(
+                *extract_quadruples_tiered(reviews, self.model, scores=scores, stats=routing, **kwargs)
+            )
+        return extract_quadruples(reviews, self.model, as_store=True, stats=routing, **kwargs)
+
+    def _attach_quadruples(self, quads):
+        self.quads = quads
+        # The rating was only kept for the fast path; outputs keep their schema
+        self.df = self.df.drop(columns=["score"], errors="ignore")
+
+    def _load_quads(self, stage):
+        self.df = self.checkpoint.load(stage)
+        self.quads = self.checkpoint.load_partial("quads")
+        if self.quads is None:
+            # Checkpoints written before the quads were kept in a QuadStore
+            self.quads = QuadStore.from_lists(*(self.df.pop(c) for c in ("aspects", "opinions", "sentiments", "categories")))
+            self.df = self.df.drop(columns=["mapped_categories"], errors="ignore")
+
+    def _output_df(self):
+        """self.df with the quads as list columns, the schema written to every output."""
         logging.info("🧩 Adding columns...")
-        self.df["aspects"] = aspects
-        self.df["opinions"] = opinions
-        self.df["sentiments"] = sentiments
-        self.df["categories"] = categories
+        aspects, opinions, sentiments, categories, mapped = self.quads.to_lists(mapped=True)
+        return self.df.assign(aspects=aspects, opinions=opinions, sentiments=sentiments,
+                              categories=categories, mapped_categories=mapped)
+
+    def extract(self):
+        if self.checkpoint.is_done("map"):
+            logging.info("⏭️ Extraction and mapping already done for this run, reusing checkpoint.")
+            self._load_quads("map")
+            return
+
+        if self.checkpoint.is_done("extract"):
+            self._load_quads("extract")
+        else:
+            logging.info("🔍 Extracting quadruples...")
+            self._attach_quadruples(self._extract_with_checkpoints())
+            self.checkpoint.save_partial("quads", self.quads)
+            self.checkpoint.save("extract", self.df)
+
         logging.info("🧩 Mapping categories...")
-        self.df = parse_and_map(self.df)
+        with self.metrics.stage("map", items_in=len(self.df)) as stage:
+            # Categories are mapped once per distinct raw value when grouping
+            # and writing outputs; this only reports the unmapped ones
+            check_store_categories(self.quads)
+            stage.items_out = len(self.df)
         if self.df.columns[0].lower() in ["unnamed: 0", "index"]:
              self.df = self.df.drop(self.df.columns[0], axis=1)
+        self.checkpoint.save("map", self.df)
 
     
-    def summarize(self):
-        logging.info("📝 Grouping according to categories...")
-        group_df = group_reviews_by_app_category_sentiment(self.df)
+    def summarize(self, group_df=None):
+        """Groups, summarizes and uploads; returns False if the summaries weren't saved."""
+        if group_df is not None:
+            self.checkpoint.save("group", group_df)
+        elif self.checkpoint.is_done("group"):
+            group_df = self.checkpoint.load("group")
+        else:
+            logging.info("📝 Grouping according to categories...")
+            with self.metrics.stage("group", items_in=len(self.df), unit="groups") as stage:
+                if config.USE_LOCAL_STORE:
+                    store = LocalStore()
+                    group_df = store.grouped_reviews(run_id=self.checkpoint.run_id)
+                    store.close()
+                else:
+                    group_df = group_reviews_by_app_category_sentiment(self.df, quads=self.quads)
+                stage.items_out = len(group_df)
+            self.checkpoint.save("group", group_df)
+
+        if self.checkpoint.is_done("summarize"):
+            summary_df = self.checkpoint.load("summarize")
+        else:
+            summary_df = self._generate_summaries(group_df)
+            self.checkpoint.save("summarize", summary_df)
+
+        if self.checkpoint.is_done("upload_summaries"):
+            logging.info("⏭️ Summaries already uploaded for this run.")
+            return True
+        if not self._upload_summaries(summary_df):
+            return False
+        self.checkpoint.save("upload_summaries")
+        return True
+
+    def _generate_summaries(self, group_df, keys=None):
+        self.group_members = None
+        if config.INCREMENTAL_SUMMARIES:
+            # Only groups that gained reviews are summarized, over their full
+            # history. `group_df` may be None when it was already merged, and
+            # `keys` limits the summaries to those groups.
+            state = GroupState()
+            if group_df is not None:
+                state.merge(group_df)
+            group_df = state.dirty_groups(keys)
+            state.close()
+            self.group_members = {
+                (app, category, sentiment): members
+                for app, category, sentiment, members in group_df[["app", "category", "sentiment", "members"]].itertuples(index=False)
+            }
         logging.info("📝 Generating summaries...")
-        summary_df = generate_summaries(group_df)
+        summary_cache = PredictionCache(
+            config.SUMMARY_CACHE_PATH, model_name=config.SUMMARY_MODEL, label="Summary cache"
+        )
+        with self.metrics.stage("summarize", items_in=len(group_df), unit="groups") as stage:
+            summary_df = generate_summaries(group_df, cache=summary_cache)
+            stage.items_out = len(summary_df)
+            stage.extra.update(cache_hits=summary_cache.hits, cache_misses=summary_cache.misses)
+        summary_cache.close()
+        if config.INCREMENTAL_SUMMARIES:
+            # A dirty group hasn't been written yet, even if its summary was
+            # cached by an attempt whose upload then failed
+            summary_df["cached"] = False
         if summary_df.columns[0].lower() in ["unnamed: 0", "index", ""]:
              summary_df = summary_df.drop(summary_df.columns[0], axis=1)
-        summary_df.to_csv("result/summary_all.csv", index=False)
+        summary_df.drop(columns=["cached"], errors="ignore").to_csv("result/summary_all.csv", index=False)
+        if config.USE_LOCAL_STORE and not summary_df.empty:
+            store = LocalStore()
+            store.write_summaries(summary_df)
+            store.close()
+        return summary_df
+
+    def _upload_summaries(self, summary_df):
         logging.info("🚀 Uploading summaries to Supabase...")
-        save_summary_to_supabase(summary_df)
-        
-        
+        with self.metrics.stage("upload_summaries", items_in=len(summary_df), unit="rows"):
+            if config.USE_LOCAL_STORE:
+                # The summaries were written locally; pushing every unsynced one
+                # also retries those a previous run failed to upload
+                store = LocalStore()
+                saved = store.sync_summaries()
+                store.close()
+            else:
+                saved = save_summary_to_supabase(summary_df)
+        if not saved:
+            # Groups stay dirty so the next run summarizes and uploads them again
+            logging.error("❌ Summaries were not saved; their groups stay pending.")
+        elif config.INCREMENTAL_SUMMARIES and not summary_df.empty:
+            written = summary_df[summary_df["summary"].notna()]
+            state = GroupState()
+            state.mark_clean(written[["app", "category", "sentiment"]].itertuples(index=False), members=self.group_members)
+            state.close()
+        return saved
+
     def save_reviews(self):
+        if self.checkpoint.is_done("upload_reviews"):
+            logging.info("⏭️ Reviews already uploaded for this run.")
+            return
         logging.info("🚀 Uploading to Supabase: reviews table...")
-        upload_to_supabase(self.df, "reviews") 
-        save_to_csv(self.df , "all_predictied.csv")
+        df = self._output_df()
+        if config.USE_LOCAL_STORE:
+            # Write locally, then let the Supabase upload overlap with summarization
+            store = LocalStore()
+            store.write_predictions(df, run_id=self.checkpoint.run_id)
+            store.close()
+            self.sync_thread = sync_in_background()
+        else:
+            # The reviews table is insert-only, so chunks that made it before a
+            # crash are recorded and skipped on resume instead of re-inserted
+            done = self.checkpoint.load_partial("upload_reviews_partial", default=[])
+
+            def chunk_done(n):
+                done.append(n)
+                self.checkpoint.save_partial("upload_reviews_partial", done)
+
+            with self.metrics.stage("upload_reviews", items_in=len(df), unit="rows") as stage:
+                stage.items_out = upload_to_supabase(df, "reviews", skip_chunks=done, on_chunk=chunk_done)
+        if config.OUTPUT_FORMAT == "parquet":
+            save_to_parquet(df)
+        else:
+            save_to_csv(df , "all_predictied.csv")
+        self.checkpoint.save("upload_reviews")
+
+    def update_rollups(self):
+        if not config.ROLLUPS_ENABLED or self.checkpoint.is_done("rollups"):
+            return
+        logging.info("📈 Updating dashboard rollups...")
+        with self.metrics.stage("rollups", items_in=len(self.df), unit="group-days") as stage:
+            stage.items_out = update_rollups(self.df, batch_id=self.checkpoint.run_id, run_id=self.checkpoint.run_id,
+                                             quads=self.quads)
+        self.checkpoint.save("rollups")
+
+    def close_model(self):
+        """Stops the extraction worker processes, if the model runs in any."""
+        if isinstance(self.model, ExtractorPool):
+            self.model.close()
+            self.model = None
 
     def run(self):
-        logging.info("🚀 Starting the pipeline...")
+        try:
+            finished = self._run()
+        finally:
+            self.close_model()
+            if self.sync_thread is not None:
+                logging.info("⏳ Waiting for background Supabase sync to finish...")
+                self.sync_thread.join()
+            self.metrics.write()
+        if finished:
+            self.checkpoint.remove()
+
+    def _run(self):
+        """Runs every stage; returns True unless a stage has to be resumed."""
+        logging.info(f"🚀 Starting the pipeline (run id {self.checkpoint.run_id})...")
 
         # 1. Fetch reviews from Play Store
         if not self.fetch_and_prepare_reviews():
             logging.info("🛑 No new reviews fetched. Exiting pipeline.")
-            return
+            return True
 
         # 2. Load data (now it loads freshly fetched CSV)
         self.load_data()
@@ -143,10 +380,104 @@ class PipelineRunner:
         # 3. Check if anything left after filtering duplicates
         if not self.content:
             logging.info("🛑 All reviews are already predicted. No new reviews to process.")
-            return
+            return True
 
         # 4. Run model + save + summarize
-        self.load_model()
+        if not self.checkpoint.is_done("extract"):
+            self.load_model()
         self.extract()
         self.save_reviews()
-        self.summarize()
+        self.update_rollups()
+        return self.summarize()
+
+    def _process_chunk(self, chunk, cache, batch_id=None, strict=False):
+        """
+        Cleans, dedups, extracts, maps and uploads one chunk; returns its
+        grouped reviews. Rollups are merged before anything is uploaded,
+        and with `strict` (the worker service) so are the groups in the
+        group state; an incomplete upload then raises UploadError instead
+        of only dead-lettering.
+        """
+        self.touched_groups = []
+        self.df = clean_reviews_for_model(chunk, keep_score=config.TIERED_EXTRACTION)
+        self.content = self.df["content"].tolist()
+        self._filter_duplicates()
+        if not self.content:
+            return None
+
+        if self.model is None:
+            self.load_model()
+        self._attach_quadruples(self._extract(self.content, self._scores(), cache))
+        check_store_categories(self.quads)
+        grouped = group_reviews_by_app_category_sentiment(self.df, quads=self.quads)
+        if strict and config.INCREMENTAL_SUMMARIES and not grouped.empty:
+            # Once uploaded, these reviews are dropped by dedup on a retry
+            state = GroupState()
+            self.touched_groups = state.merge(grouped)
+            state.close()
+        if config.ROLLUPS_ENABLED and batch_id is not None:
+            # Merged before upload for the same reason; merging is idempotent on batch_id
+            update_rollups(self.df, batch_id=batch_id, run_id=self.checkpoint.run_id, quads=self.quads)
+
+        df = self._output_df()
+        uploaded = upload_to_supabase(df, "reviews")
+        if strict and uploaded < len(df):
+            raise UploadError(f"only {uploaded}/{len(df)} reviews were uploaded")
+        if config.OUTPUT_FORMAT == "parquet":
+            save_to_parquet(df)
+        else:
+            save_to_csv(df, "all_predictied.csv", append=True)
+        return grouped
+
+    def run_streaming(self, chunksize=config.STREAM_CHUNK_SIZE, db_table=None):
+        """
+        Runs the pipeline chunk by chunk: each chunk is cleaned, deduplicated,
+        extracted, mapped and uploaded before the next is read, and only the
+        grouped reviews are kept for the final summarization. With
+        `db_table`, reviews are paged from that table of the SQLite database
+        at `input_path` instead of being fetched from the Play Store.
+        """
+        try:
+            finished = self._run_streaming(chunksize, db_table)
+        finally:
+            self.close_model()
+            self.metrics.write()
+        if finished:
+            self.checkpoint.remove()
+
+    def _run_streaming(self, chunksize, db_table=None):
+        logging.info(f"🚀 Starting the pipeline in streaming mode (run id {self.checkpoint.run_id})...")
+
+        if db_table is not None:
+            logging.info(f"🗄️ Streaming reviews from table '{db_table}' in {self.input_path}")
+            chunks = DataLoader.iter_chunks_from_db(self.input_path, db_table, chunksize=chunksize)
+        elif not self.fetch_and_prepare_reviews():
+            logging.info("🛑 No new reviews fetched. Exiting pipeline.")
+            return True
+        else:
+            chunks = DataLoader.iter_chunks(self.input_path, chunksize)
+
+        if os.path.exists("all_predictied.csv"):
+            os.remove("all_predictied.csv")
+
+        cache = PredictionCache(self.cache_path, model_name=self.model_name,
+                                settings=extraction_settings()) if self.cache_path else None
+        grouped_chunks = []
+        processed = 0
+        for number, chunk in enumerate(chunks):
+            with self.metrics.stage("stream_chunk", items_in=len(chunk)) as stage:
+                grouped = self._process_chunk(chunk, cache, batch_id=f"{self.checkpoint.run_id}-chunk{number}")
+                stage.items_out = 0 if grouped is None else len(self.df)
+            if grouped is not None:
+                grouped_chunks.append(grouped)
+                processed += len(self.df)
+            logging.info(f"📦 Processed chunk, {processed} new reviews so far")
+        if cache is not None:
+            cache.close()
+        self.df = self.content = self.quads = None
+
+        if not processed:
+            logging.info("🛑 All reviews are already predicted. No new reviews to process.")
+            return True
+
+        return self.summarize(merge_grouped_reviews(grouped_chunks))
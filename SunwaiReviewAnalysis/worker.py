@@ -0,0 +1,148 @@
+import logging
+import multiprocessing as mp
+import os
+import time
+import pandas as pd
+from . import config
+from .datastore.cache import PredictionCache, extraction_settings
+from .datastore.job_queue import JobQueue
+from .datastore.key_index import get_review_index
+from .datastore.saver import UploadError
+from .metrics import RunMetrics
+from .models.summary_model import get_summarizer
+from .preprocess.group_state import GroupState
+from .run_pipeline import PipelineRunner
+
+
+class ReviewWorker:
+    """
+    Long-running worker that keeps the extractor and summarizer loaded and
+    drains review batches from the job queue. A job is acknowledged only
+    after its predictions and summaries have been persisted; otherwise it is
+    released for a retry.
+    """
+
+    def __init__(self, name=None, queue_path=config.QUEUE_PATH, model_name=config.MODEL_NAME,
+                 poll_seconds=config.QUEUE_POLL_SECONDS):
+        self.name = name or f"worker-{os.getpid()}"
+        self.queue = JobQueue(queue_path)
+        self.poll_seconds = poll_seconds
+        self.runner = PipelineRunner(model_name=model_name, workers=1, run_id=self.name)
+        self.cache = PredictionCache(self.runner.cache_path, model_name=model_name,
+                                     settings=extraction_settings()) if self.runner.cache_path else None
+
+    def warm_up(self):
+        logging.info(f"🔥 {self.name}: loading models...")
+        self.runner.load_model()
+        get_summarizer()
+
+    def process(self, records, job_id=None):
+        """
+        Runs one job; raises if its reviews or summaries were not persisted
+        so the job is retried.
+        """
+        # Pick up reviews other workers uploaded since the last job
+        get_review_index(refresh=True)
+        grouped = self.runner._process_chunk(pd.DataFrame.from_records(records), self.cache,
+                                             batch_id=None if job_id is None else f"job-{job_id}", strict=True)
+        processed = 0 if grouped is None else len(self.runner.df)
+        if config.INCREMENTAL_SUMMARIES:
+            self._summarize_claimed()
+        elif grouped is not None and not grouped.empty:
+            self._save_summaries(self.runner._generate_summaries(grouped))
+        return processed
+
+    def _summarize_claimed(self):
+        """
+        Summarizes the groups this job changed, plus a few left dirty by
+        failed jobs (such as this job's earlier attempts, whose reviews dedup
+        has since dropped). Groups are claimed first, so concurrent workers
+        never summarize the same group.
+        """
+        state = GroupState()
+        try:
+            keys = state.claim(self.name, keys=self.runner.touched_groups)
+            keys += state.claim(self.name, limit=config.SUMMARY_CLAIM_LIMIT)
+            if keys:
+                self._save_summaries(self.runner._generate_summaries(None, keys=keys))
+        finally:
+            state.release(self.name)
+            state.close()
+
+    def _save_summaries(self, summary_df):
+        if not self.runner._upload_summaries(summary_df):
+            raise UploadError("summaries were not saved")
+
+    def run_once(self):
+        """Processes one job; returns False when the queue was empty."""
+        job = self.queue.lease(self.name)
+        if job is None:
+            return False
+        job_id, records = job
+        # Each job gets its own report; the worker's file holds the latest one
+        self.runner.metrics = RunMetrics(self.name)
+        try:
+            processed = self.process(records, job_id)
+        except Exception as e:
+            logging.error(f"❌ {self.name}: job {job_id} failed: {e}")
+            self.queue.nack(job_id, e)
+        else:
+            self.queue.ack(job_id)
+            logging.info(f"✅ {self.name}: job {job_id} done ({processed} new reviews of {len(records)})")
+        finally:
+            self.runner.metrics.write()
+        return True
+
+    def run(self, max_idle_seconds=None):
+        """Polls the queue until stopped, or until idle for `max_idle_seconds`."""
+        self.warm_up()
+        idle_since = time.monotonic()
+        try:
+            while True:
+                if self.run_once():
+                    idle_since = time.monotonic()
+                elif max_idle_seconds is not None and time.monotonic() - idle_since >= max_idle_seconds:
+                    logging.info(f"💤 {self.name}: queue idle, stopping")
+                    return
+                else:
+                    time.sleep(self.poll_seconds)
+        finally:
+            if self.cache is not None:
+                self.cache.close()
+            self.queue.close()
+
+
+def _run_worker(index, max_idle_seconds):
+    ReviewWorker(name=f"worker-{index}").run(max_idle_seconds=max_idle_seconds)
+
+
+def run_workers(workers=config.SERVICE_WORKERS, max_idle_seconds=None):
+    """Runs `workers` ReviewWorkers, each in its own process with its own models."""
+    if workers <= 1:
+        return _run_worker(0, max_idle_seconds)
+    ctx = mp.get_context("spawn")
+    processes = [ctx.Process(target=_run_worker, args=(i, max_idle_seconds)) for i in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+def enqueue_new_reviews(batch_size=config.QUEUE_BATCH_SIZE):
+    """Fetches and cleans new reviews, then queues them for the workers in batches."""
+    runner = PipelineRunner()
+    queue = JobQueue()
+    try:
+        if not runner.fetch_and_prepare_reviews():
+            logging.info("🛑 No new reviews fetched, nothing to enqueue.")
+            return 0
+        jobs = 0
+        for chunk in pd.read_csv(runner.input_path, chunksize=batch_size):
+            queue.enqueue(chunk.to_dict("records"))
+            jobs += 1
+        logging.info(f"📥 Enqueued {jobs} jobs, queue now {queue.stats()}")
+        runner.checkpoint.remove()
+        return jobs
+    finally:
+        runner.metrics.write()
+        queue.close()
@@ -0,0 +1,87 @@
+"""
+Compares per-review extraction latency with a fixed max_length=512 and no
+limits (pyabsa's own ABSAGenerator.predict, the original path) against the
+adaptive generation budget, sentence segmentation and per-review time
+budget. The agreement columns validate the budgeted path against it.
+Held-out reviews are mixed with pathological inputs (emoji floods,
+repeated characters, long walls of text).
+
+    python -m benchmarks.bench_generation_budget --sample 200 --output budget.json
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import pandas as pd
+from SunwaiReviewAnalysis import config
+from SunwaiReviewAnalysis.metrics import latency_percentiles
+from SunwaiReviewAnalysis.models.ABSA import QuadrupleExtractor, ReviewTimeout
+from .datasets import SEED_CSV
+from .validate_backends import _quads, agreement, load_sample
+
+
+def pathological(reviews, n, seed):
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(n):
+        kind = i % 3
+        if kind == 0:
+            inputs.append("😡" * rng.randint(200, 800))
+        elif kind == 1:
+            inputs.append("worst app " + "!" * rng.randint(300, 1000) + " sooooo" + "o" * rng.randint(200, 600))
+        else:
+            inputs.append(" ".join(rng.choices(reviews, k=rng.randint(15, 40))))
+    return inputs
+
+
+def run(extractor, reviews, adaptive):
+    latencies, results = [], []
+    for review in reviews:
+        started = time.perf_counter()
+        try:
+            results.append(_quads(extractor.predict(review, max_length=None if adaptive else 512)))
+        except ReviewTimeout:
+            extractor.abandoned += 1
+            results.append(set())
+        latencies.append(time.perf_counter() - started)
+    return results, {
+        "mode": "adaptive" if adaptive else "fixed",
+        "seconds": round(sum(latencies), 3),
+        "abandoned": extractor.abandoned,
+        **latency_percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=SEED_CSV, help="CSV with a 'content' column")
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--pathological", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--model", default=config.MODEL_NAME)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    reviews = load_sample(args.input, args.sample, args.seed)
+    reviews += pathological(reviews, args.pathological, args.seed)
+    print(f"Timing {len(reviews)} reviews ({args.pathological} pathological)", file=sys.stderr)
+
+    extractor = QuadrupleExtractor(model_name=args.model)
+    limits = extractor.time_budget, extractor.segment_tokens
+    extractor.time_budget, extractor.segment_tokens = None, None
+    baseline, base_stats = run(extractor, reviews, adaptive=False)
+
+    extractor.time_budget, extractor.segment_tokens = limits
+    extractor.abandoned = 0
+    quads, stats = run(extractor, reviews, adaptive=True)
+    rows = [base_stats, {**stats, **agreement(baseline, quads)}]
+
+    print(pd.DataFrame(rows).set_index("mode").T.to_string())
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "reviews": len(reviews), "seed": args.seed, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Times group_reviews_by_app_category_sentiment on a synthetic dataset.
+
+    python -m benchmarks.bench_grouping --quads 1000000
+"""
+import argparse
+import time
+from SunwaiReviewAnalysis.preprocess.mapping import group_reviews_by_app_category_sentiment, parse_and_map
+from .datasets import make_predictions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quads", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = parse_and_map(make_predictions(args.quads // 4, max_quads=7))
+    quads = int(df["mapped_categories"].str.len().sum())
+    start = time.perf_counter()
+    grouped = group_reviews_by_app_category_sentiment(df)
+    elapsed = time.perf_counter() - start
+    print(f"{len(df)} reviews / {quads} quads -> {len(grouped)} groups "
+          f"in {elapsed:.2f}s ({quads / elapsed:,.0f} quads/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares the memory and grouping time of four lists of per-review lists
+against a QuadStore holding the same quads.
+
+    python -m benchmarks.bench_quad_store --quads 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from SunwaiReviewAnalysis.models.quad_store import QuadStore
+from SunwaiReviewAnalysis.preprocess.mapping import group_reviews_by_app_category_sentiment, parse_and_map
+from .datasets import make_predictions
+
+FIELDS = ("aspects", "opinions", "sentiments", "categories")
+
+
+def _fresh(values):
+    # Decoded model output gives every quad its own string objects
+    return [value.encode().decode() for value in values]
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def _fill_store(rows):
+    store = QuadStore()
+    for row in rows:
+        store.append(*(_fresh(values) for values in row))
+    store.nbytes()  # folds pending appends into the NumPy columns
+    return store
+
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quads", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = make_predictions(args.quads // 4, max_quads=7)
+    rows = list(zip(*(df[field].tolist() for field in FIELDS)))
+    n_quads = int(df["sentiments"].str.len().sum())
+
+    lists, list_bytes, list_seconds = _measure(
+        lambda: tuple([_fresh(row[i]) for row in rows] for i in range(len(FIELDS)))
+    )
+    del lists
+    store, store_bytes, store_seconds = _measure(lambda: _fill_store(rows))
+
+    print(f"{len(rows)} reviews / {n_quads} quads")
+    print(f"lists of lists: {list_bytes / 2**20:8.1f} MB ({list_bytes / n_quads:6.1f} B/quad), built in {list_seconds:.2f}s")
+    print(f"QuadStore:      {store_bytes / 2**20:8.1f} MB ({store_bytes / n_quads:6.1f} B/quad), built in {store_seconds:.2f}s "
+          f"({store.nbytes() / n_quads:.1f} B/quad in flat columns)")
+
+    mapped = parse_and_map(df.copy())
+    start = time.perf_counter()
+    group_reviews_by_app_category_sentiment(mapped)
+    print(f"group from list columns: {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    group_reviews_by_app_category_sentiment(df[["content", "app"]], quads=store)
+    print(f"group from QuadStore:    {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
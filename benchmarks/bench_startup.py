@@ -0,0 +1,46 @@
+"""
+Measures how long it takes to import the pipeline and to finish a run
+that exits early with no new reviews. Each measurement runs in a fresh
+interpreter so module caching doesn't hide import cost.
+
+    python -m benchmarks.bench_startup
+"""
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["torch", "transformers", "pyabsa", "supabase"]
+
+SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import pandas as pd
+import SunwaiReviewAnalysis.run_pipeline as rp
+imported = time.perf_counter()
+
+rp.fetch_new_reviews = lambda *a, **k: pd.DataFrame()
+rp.PipelineRunner(run_id="bench-startup").run()
+finished = time.perf_counter()
+
+print(json.dumps({
+    "import_seconds": imported - start,
+    "noop_run_seconds": finished - imported,
+    "heavy_modules_loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def main():
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET % HEAVY_MODULES],
+        capture_output=True, text=True, check=True,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    print(json.dumps(result, indent=2))
+    total = result["import_seconds"] + result["noop_run_seconds"]
+    status = "OK" if total < 1.0 and not result["heavy_modules_loaded"] else "SLOW"
+    print(f"{status}: import + no-op run took {total:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
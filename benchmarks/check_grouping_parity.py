@@ -0,0 +1,127 @@
+"""
+Checks group_reviews_by_app_category_sentiment against the original
+iterrows/literal_eval implementation on synthetic predictions (native
+list cells, stringified cells, mismatched lengths, broken cells and
+single-word reviews) and, when given, on a predictions CSV. The QuadStore
+path is compared too.
+
+    python -m benchmarks.check_grouping_parity --rows 20000 --csv result/all_predictied.csv
+
+Exits with status 1 on any mismatch.
+"""
+import argparse
+import ast
+import logging
+import sys
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+from SunwaiReviewAnalysis.models.quad_store import QuadStore
+from SunwaiReviewAnalysis.preprocess.mapping import group_reviews_by_app_category_sentiment, parse_and_map
+from .datasets import make_predictions
+
+
+def reference_grouping(df):
+    """The pre-vectorization implementation, kept verbatim for comparison."""
+    grouped_data = defaultdict(lambda: defaultdict(lambda: defaultdict(lambda: {
+        "reviews": [],
+        "aspects": [],
+        "opinions": []
+    })))
+
+    for _, row in df.iterrows():
+        app = str(row.get("app", "")).strip()
+        content = str(row.get("content", "")).strip()
+        if len(content.split()) <= 1:
+            continue
+
+        try:
+            categories = ast.literal_eval(str(row.get("mapped_categories", [])))
+            sentiments = ast.literal_eval(str(row.get("sentiments", [])))
+            aspects = ast.literal_eval(str(row.get("aspects", [])))
+            opinions = ast.literal_eval(str(row.get("opinions", [])))
+        except Exception:
+            continue
+
+        for i in range(min(len(categories), len(sentiments))):
+            cat = categories[i]
+            sent = sentiments[i]
+            asp = aspects[i] if i < len(aspects) else "NULL"
+            opn = opinions[i] if i < len(opinions) else "NULL"
+
+            grouped_entry = grouped_data[app][cat][sent]
+            grouped_entry["reviews"].append(content)
+            grouped_entry["aspects"].append(asp)
+            grouped_entry["opinions"].append(opn)
+
+    records = []
+    for app, cat_dict in grouped_data.items():
+        for cat, sent_dict in cat_dict.items():
+            for sentiment, data in sent_dict.items():
+                records.append({
+                    "app": app,
+                    "category": cat,
+                    "sentiment": sentiment,
+                    "reviews": data["reviews"],
+                    "aspects": data["aspects"],
+                    "opinions": data["opinions"]
+                })
+    return pd.DataFrame(records)
+
+
+def synthetic(rows, seed):
+    rng = np.random.default_rng(seed)
+    df = parse_and_map(make_predictions(rows, max_quads=5, seed=seed))
+    picks = rng.random(len(df))
+    # Stringified cells, as read back from CSV
+    as_str = picks < 0.2
+    for col in ("aspects", "opinions", "sentiments", "mapped_categories"):
+        df.loc[as_str, col] = df.loc[as_str, col].astype(str)
+    # Aspect/opinion lists shorter than the quads they belong to
+    short = (picks >= 0.2) & (picks < 0.3)
+    df.loc[short, "aspects"] = df.loc[short, "aspects"].map(lambda x: x[:1])
+    df.loc[short, "opinions"] = df.loc[short, "opinions"].map(lambda x: x[:-1])
+    # Unparseable cells and single-word reviews are skipped by both
+    df.loc[(picks >= 0.3) & (picks < 0.31), "sentiments"] = "['positive'"
+    df.loc[(picks >= 0.31) & (picks < 0.33), "content"] = "good"
+    return df
+
+
+def compare(name, expected, actual):
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)[list(expected.columns)] if len(actual.columns) else actual
+    same = expected.shape == actual.shape and all(
+        expected[col].tolist() == actual[col].tolist() for col in expected.columns
+    )
+    print(f"{'OK  ' if same else 'FAIL'} {name}: {len(expected)} groups expected, {len(actual)} produced")
+    return same
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="predictions CSV with mapped_categories/sentiments/aspects/opinions")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    ok = True
+    df = synthetic(args.rows, args.seed)
+    ok &= compare("synthetic", reference_grouping(df), group_reviews_by_app_category_sentiment(df))
+
+    clean = parse_and_map(make_predictions(args.rows, max_quads=5, seed=args.seed))
+    store = QuadStore.from_lists(clean["aspects"], clean["opinions"], clean["sentiments"], clean["categories"])
+    ok &= compare("QuadStore", reference_grouping(clean),
+                  group_reviews_by_app_category_sentiment(clean[["app", "content"]], quads=store))
+
+    if args.csv:
+        df = pd.read_csv(args.csv)
+        if "mapped_categories" not in df.columns:
+            df = parse_and_map(df)
+        ok &= compare(args.csv, reference_grouping(df), group_reviews_by_app_category_sentiment(df))
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
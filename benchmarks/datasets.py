@@ -0,0 +1,80 @@
+"""
+Synthetic bank-review datasets for benchmarks, modeled on the Play Store
+exports in BankAppDataCollection/.
+"""
+import os
+import numpy as np
+import pandas as pd
+from SunwaiReviewAnalysis.preprocess.mapping import bank_category_map
+
+SEED_CSV = os.path.join(os.path.dirname(__file__), "..", "BankAppDataCollection", "pak_app_bank_reviews.csv")
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+SENTIMENTS = ["positive", "negative", "neutral"]
+FALLBACK_REVIEWS = [
+    "very easy to use", "app is not working after update", "worst app ever cannot login",
+    "nice app but transfer takes too long", "otp never arrives please fix", "good app",
+]
+
+
+def _seed_reviews():
+    if os.path.exists(SEED_CSV):
+        seed = pd.read_csv(SEED_CSV, usecols=["app", "content", "score"]).dropna()
+        if not seed.empty:
+            return seed
+    return pd.DataFrame({
+        "app": ["UBL Digital", "Al Habib", "Meezan Bank", "Sunwai", "HBL", "HBL"],
+        "content": FALLBACK_REVIEWS,
+        "score": [5, 1, 1, 3, 1, 5],
+    })
+
+
+def make_reviews(n, duplicate_rate=0.1, seed=0):
+    """Raw fetched reviews: content, score, app. About `duplicate_rate` are exact repeats."""
+    rng = np.random.default_rng(seed)
+    base = _seed_reviews()
+    picks = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+    # A numeric suffix keeps most reviews unique while preserving length/shape
+    suffix = pd.Series(np.arange(n), dtype=str)
+    unique = rng.random(n) >= duplicate_rate
+    picks.loc[unique, "content"] = picks.loc[unique, "content"].astype(str) + " #" + suffix[unique]
+    return picks[["content", "score", "app"]]
+
+
+def make_predictions(n, max_quads=4, seed=0):
+    """Reviews with aligned aspect/opinion/sentiment/category list columns."""
+    rng = np.random.default_rng(seed)
+    df = make_reviews(n, seed=seed)[["content", "app"]].copy()
+    raw_categories = np.array(list(bank_category_map.keys()) + ["UNKNOWN#GENERAL"], dtype=object)
+    counts = rng.integers(1, max_quads + 1, n)
+    words = df["content"].str.split()
+
+    aspects, opinions, sentiments, categories = [], [], [], []
+    for k, review_words in zip(counts, words):
+        aspects.append([review_words[i % len(review_words)] for i in range(k)])
+        opinions.append([review_words[-(i % len(review_words)) - 1] for i in range(k)])
+        sentiments.append([SENTIMENTS[j] for j in rng.integers(0, 3, k)])
+        categories.append(list(raw_categories[rng.integers(0, len(raw_categories), k)]))
+
+    df["aspects"] = aspects
+    df["opinions"] = opinions
+    df["sentiments"] = sentiments
+    df["categories"] = categories
+    return df
+
+
+class StubExtractor:
+    """Deterministic QuadrupleExtractor stand-in with no model behind it."""
+
+    def predict(self, text, max_length=512):
+        words = text.split() or ["NULL"]
+        return {"Quadruples": [{
+            "aspect": words[0],
+            "opinion": words[-1],
+            "polarity": SENTIMENTS[len(words) % 3],
+            "category": "SOFTWARE#GENERAL",
+        }]}
+
+
+def stub_summarizer(texts, max_length=130, min_length=5, **kwargs):
+    texts = texts if isinstance(texts, list) else [texts]
+    return [{"summary_text": " ".join(t.split()[:max_length])} for t in texts]
@@ -0,0 +1,187 @@
+"""
+Times each pipeline subsystem on synthetic datasets and compares the
+results against a stored baseline. Models and Supabase are replaced by
+stubs, so this measures the pipeline's own overhead.
+
+    python -m benchmarks.run_benchmarks --scales 1k 10k --output bench.json
+    python -m benchmarks.run_benchmarks --scales 1k 10k --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --scales 1k 10k --baseline benchmarks/baseline.json
+
+Exits with status 1 if any subsystem is slower than the baseline by more
+than --tolerance. benchmarks/baseline.json was recorded at the 1k and 10k
+scales on the machine in its "meta"; timings only compare on the same
+hardware, so re-run the --save-baseline command above on a new machine
+before comparing.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import pandas as pd
+from SunwaiReviewAnalysis.datastore import key_index
+from SunwaiReviewAnalysis.datastore.fake_client import FakeSupabaseClient
+from SunwaiReviewAnalysis.datastore.saver import upload_to_supabase
+from SunwaiReviewAnalysis.models import summary_model
+from SunwaiReviewAnalysis.models.extractor import extract_quadruples
+from SunwaiReviewAnalysis.preprocess.cleaning import clean_reviews_for_model
+from SunwaiReviewAnalysis.preprocess.mapping import parse_and_map, group_reviews_by_app_category_sentiment
+from SunwaiReviewAnalysis.run_pipeline import PipelineRunner
+from .datasets import SCALES, StubExtractor, make_predictions, make_reviews, stub_summarizer
+
+
+def bench_clean(n, tmp):
+    df = make_reviews(n)
+    return lambda: clean_reviews_for_model(df.copy())
+
+
+def bench_filter_duplicates(n, tmp):
+    df = make_reviews(n)
+    index = key_index.ReviewKeyIndex(os.path.join(tmp, f"keys-{n}.sqlite"))
+    half = df.iloc[: n // 2]
+    index.add_many(half["content"].tolist(), half["app"].tolist())
+    key_index._index = index
+
+    def run():
+        runner = PipelineRunner.__new__(PipelineRunner)
+        runner.df = df.copy()
+        runner._filter_duplicates()
+    return run
+
+
+def bench_parse_and_map(n, tmp):
+    df = make_predictions(n)
+    df["categories"] = df["categories"].astype(str)  # as read back from CSV
+    return lambda: parse_and_map(df.copy())
+
+
+def bench_group(n, tmp):
+    df = parse_and_map(make_predictions(n))
+    return lambda: group_reviews_by_app_category_sentiment(df)
+
+
+def bench_generate_summaries(n, tmp):
+    grouped = group_reviews_by_app_category_sentiment(parse_and_map(make_predictions(n)))
+    summary_model.get_summarizer = lambda *a, **k: stub_summarizer
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            summary_model.generate_summaries(grouped)
+    return run
+
+
+def bench_extract(n, tmp):
+    reviews = make_reviews(n)["content"].tolist()
+    return lambda: extract_quadruples(reviews, StubExtractor(), batch_size=1, workers=1)
+
+
+def bench_upload(n, tmp):
+    df = make_predictions(n)
+
+    def run():
+        upload_to_supabase(df, "reviews", client=FakeSupabaseClient(),
+                           dead_letter_path=os.path.join(tmp, "dead_letters.jsonl"))
+    return run
+
+
+SUBSYSTEMS = {
+    "clean_reviews_for_model": bench_clean,
+    "_filter_duplicates": bench_filter_duplicates,
+    "parse_and_map": bench_parse_and_map,
+    "group_reviews_by_app_category_sentiment": bench_group,
+    "generate_summaries": bench_generate_summaries,
+    "extract_quadruples": bench_extract,
+    "upload_to_supabase": bench_upload,
+}
+
+
+def run_suite(scales, subsystems, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            n = SCALES[scale]
+            for name in subsystems:
+                fn = SUBSYSTEMS[name](n, tmp)
+                timings = []
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    fn()
+                    timings.append(time.perf_counter() - start)
+                seconds = min(timings)
+                results.append({
+                    "subsystem": name,
+                    "scale": scale,
+                    "rows": n,
+                    "seconds": round(seconds, 5),
+                    "rows_per_sec": round(n / seconds, 1) if seconds else None,
+                })
+                print(f"{name:<42} {scale:>5} {seconds:9.3f}s", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    base = {(r["subsystem"], r["scale"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        previous = base.get((r["subsystem"], r["scale"]))
+        if not previous:
+            continue
+        r["baseline_seconds"] = previous
+        r["ratio"] = round(r["seconds"] / previous, 3)
+        if r["ratio"] > 1 + tolerance:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", nargs="+", default=["1k", "10k"], choices=list(SCALES))
+    parser.add_argument("--subsystems", nargs="+", default=list(SUBSYSTEMS), choices=list(SUBSYSTEMS))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest is kept")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="write results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run_suite(args.scales, args.subsystems, args.repeat)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    for r in regressions:
+        print(f"REGRESSION {r['subsystem']} @ {r['scale']}: {r['seconds']}s vs {r['baseline_seconds']}s "
+              f"(x{r['ratio']})", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
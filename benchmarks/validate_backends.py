@@ -0,0 +1,109 @@
+"""
+Compares QuadrupleExtractor backends against the fp32 torch baseline on a
+held-out sample of real reviews, reporting quadruple agreement next to
+latency and throughput.
+
+    python -m benchmarks.validate_backends --sample 200 --backends int8 onnx --output backends.json
+"""
+import argparse
+import json
+import sys
+import time
+import pandas as pd
+from SunwaiReviewAnalysis import config
+from SunwaiReviewAnalysis.metrics import latency_percentiles
+from SunwaiReviewAnalysis.models.ABSA import BACKENDS, QuadrupleExtractor
+from .datasets import SEED_CSV
+
+FIELDS = ("aspect", "opinion", "polarity", "category")
+
+
+def load_sample(path, n, seed):
+    """Held-out reviews: a seeded sample of multi-word reviews from `path`."""
+    reviews = pd.read_csv(path, usecols=["content"]).dropna()["content"].astype(str)
+    reviews = reviews[reviews.str.split().str.len() > 2].drop_duplicates()
+    return reviews.sample(min(n, len(reviews)), random_state=seed).tolist()
+
+
+def _quads(result):
+    return {
+        tuple(str(q.get(field, "")).strip().lower() for field in FIELDS)
+        for q in result.get("Quadruples", [])
+    }
+
+
+def run_backend(backend, reviews, model_name, batch_size):
+    started = time.perf_counter()
+    extractor = QuadrupleExtractor(model_name=model_name, backend=backend)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    started = time.perf_counter()
+    # One call, so reviews are length-bucketed as in the pipeline and each
+    # gets its batch's share of the time
+    results = extractor.predict_batch(reviews, batch_size=batch_size, latencies=latencies)
+    seconds = time.perf_counter() - started
+
+    return [_quads(r) for r in results], {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 2),
+        "seconds": round(seconds, 3),
+        "reviews_per_sec": round(len(reviews) / seconds, 2) if seconds else None,
+        **latency_percentiles(latencies),
+    }
+
+
+def agreement(baseline, candidate):
+    """Exact-match rate per review, quad-level P/R/F1 and per-field agreement against the baseline."""
+    exact = sum(b == c for b, c in zip(baseline, candidate))
+    matched = sum(len(b & c) for b, c in zip(baseline, candidate))
+    n_base = sum(len(b) for b in baseline)
+    n_cand = sum(len(c) for c in candidate)
+    precision = matched / n_cand if n_cand else 1.0
+    recall = matched / n_base if n_base else 1.0
+    report = {
+        "review_exact_match": round(exact / len(baseline), 4) if baseline else None,
+        "quad_precision": round(precision, 4),
+        "quad_recall": round(recall, 4),
+        "quad_f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+    }
+    for i, field in enumerate(FIELDS):
+        same = sum({q[i] for q in b} == {q[i] for q in c} for b, c in zip(baseline, candidate))
+        report[f"{field}_agreement"] = round(same / len(baseline), 4) if baseline else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=SEED_CSV, help="CSV with a 'content' column")
+    parser.add_argument("--sample", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--backends", nargs="+", default=["int8", "onnx"], choices=[b for b in BACKENDS if b != "torch"])
+    parser.add_argument("--model", default=config.MODEL_NAME)
+    parser.add_argument("--batch-size", type=int, default=config.BATCH_SIZE)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    reviews = load_sample(args.input, args.sample, args.seed)
+    print(f"Validating on {len(reviews)} held-out reviews", file=sys.stderr)
+
+    baseline, base_stats = run_backend("torch", reviews, args.model, args.batch_size)
+    rows = [{**base_stats, "speedup": 1.0}]
+    for backend in args.backends:
+        try:
+            quads, stats = run_backend(backend, reviews, args.model, args.batch_size)
+        except Exception as e:
+            print(f"⚠️ Backend '{backend}' failed: {e}", file=sys.stderr)
+            continue
+        if stats["reviews_per_sec"] and base_stats["reviews_per_sec"]:
+            stats["speedup"] = round(stats["reviews_per_sec"] / base_stats["reviews_per_sec"], 2)
+        rows.append({**stats, **agreement(baseline, quads)})
+
+    print(pd.DataFrame(rows).set_index("backend").T.to_string())
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"model": args.model, "sample": len(reviews), "seed": args.seed, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
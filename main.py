@@ -1,3 +1,29 @@
+import argparse
 from SunwaiReviewAnalysis.run_pipeline import PipelineRunner
-pipeline = PipelineRunner()
-pipeline.run()
\ No newline at end of file
+
+parser = argparse.ArgumentParser(description="Run the Play Store review analysis pipeline.")
+parser.add_argument("--resume", metavar="RUN_ID", help="resume a previous run from its checkpoints")
+parser.add_argument("--stream", action="store_true", help="process reviews in bounded-memory chunks")
+parser.add_argument("--from-db", nargs=2, metavar=("DB_PATH", "TABLE"),
+                    help="stream reviews (content, app) from a SQLite table instead of fetching them")
+parser.add_argument("--enqueue", action="store_true", help="fetch new reviews and queue them for the workers")
+parser.add_argument("--serve", action="store_true", help="run long-lived workers that drain the review queue")
+parser.add_argument("--workers", type=int, default=None, help="number of worker processes for --serve")
+parser.add_argument("--max-idle", type=float, default=None, help="stop --serve workers after this many idle seconds")
+args = parser.parse_args()
+
+if args.enqueue or args.serve:
+    from SunwaiReviewAnalysis import config
+    from SunwaiReviewAnalysis.worker import enqueue_new_reviews, run_workers
+    if args.enqueue:
+        enqueue_new_reviews()
+    if args.serve:
+        run_workers(args.workers or config.SERVICE_WORKERS, max_idle_seconds=args.max_idle)
+else:
+    if args.from_db:
+        db_path, table = args.from_db
+        PipelineRunner(input_path=db_path, run_id=args.resume).run_streaming(db_table=table)
+    elif args.stream:
+        PipelineRunner(run_id=args.resume).run_streaming()
+    else:
+        PipelineRunner(run_id=args.resume).run()